@@ -1,24 +1,508 @@
 # Multi-Agent Instagram Content Generation System
 # Based on the Towards Data Science article: "Agentic AI 103: Building Multi-Agent Teams"
 
+import argparse
+import io
+import logging
+import mmap
 import os
+import re
+import signal
+import sys
+import asyncio
+import base64
+import functools
+import hashlib
+from abc import ABC, abstractmethod
 from textwrap import dedent
 from pathlib import Path
-from typing import Optional
-import json
+from typing import TYPE_CHECKING, List, NamedTuple, Optional, Set, Tuple
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from datetime import datetime
 
-# Core imports for the multi-agent system
-from agno.agent import Agent
-from agno.models.google import Gemini
-from agno.team import Team
-from agno.tools.duckduckgo import DuckDuckGoTools
-from agno.tools.file import FileTools
+import orjson
 
+logger = logging.getLogger(__name__)
 
-from dotenv import load_dotenv
+# The multi-agent system (agno), google-genai and numpy are imported where
+# they are used, so menu paths that never generate content don't pay for
+# loading them
+if TYPE_CHECKING:
+    import numpy as np
+    from agno.agent import Agent
+    from agno.models.google import Gemini
+    from agno.team import Team
+    from agno.tools.file import FileTools
+    from google import genai
+    from search_tools import CoalescingDuckDuckGoTools
 
-load_dotenv()  # take environment variables from .env file
+# Static prompts shared by every agent and team; keeping them byte-identical
+# across runs lets Gemini reuse the cached prompt prefix. They are not
+# registered as explicit cached contents: together they are a few hundred
+# tokens, well below the minimum size of a Gemini context cache, and a cached
+# request can't also carry the system instruction and tools agno sends.
+_WRITER_ROLE = dedent("""\
+    You are an experienced digital marketer who specializes in Instagram posts.
+    You know how to write an engaging, SEO-friendly post.
+    You know all about wine, cheese, and gourmet foods found in grocery stores.
+    You are also a wine sommelier who knows how to make recommendations.
+    """)
+
+_WRITER_DESC = dedent("""\
+    Write clear, engaging content using a neutral to fun and conversational tone.
+    Write an Instagram caption about the requested topic.
+    Write a short call to action at the end of the message.
+    Add 5 hashtags to the caption.
+    If you encounter a character encoding error, remove the character before sending your response to the Coordinator.
+    """)
+
+_ILLUSTRATOR_DESC = dedent("""\
+    Based on the caption created by Marketer, create a prompt to generate an engaging photo about the requested topic.
+    If you encounter a character encoding error, remove the character before sending your response to the Coordinator.
+    """)
+
+_TEAM_INSTRUCTIONS = dedent("""\
+    You are a team of content writers working together to create engaging Instagram posts.
+    First, you ask the 'Writer' to create a caption for the requested topic.
+    Next, you ask the 'Illustrator' to create a prompt to generate an engaging illustration for the requested topic.
+    Do not use emojis in the caption.
+    If you encounter a character encoding error, remove the character before saving the file.
+    Use the following template to generate the output:
+    - Post
+    - Prompt to generate an illustration
+    """)
+
+# Maximum number of texts per Gemini embedding request
+_EMBED_BATCH_SIZE = 100
+
+# Terminal states of a Gemini batch job
+_BATCH_DONE_STATES = frozenset({
+    "JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"
+})
+
+# Models and prompts of Batch API generations, folded into their response
+# cache keys so batch posts are never served as team results
+_BATCH_FINGERPRINT = "|".join([
+    "batch", "gemini-2.0-flash-lite", _WRITER_ROLE, _WRITER_DESC, "gemini-2.0-flash", _ILLUSTRATOR_DESC
+])
+
+# Queued by flush() so the history writer releases the backend's open files
+_CLOSE_HISTORY = object()
+
+def _read_history_tail(path: Path, limit: int) -> list:
+    """
+    Parse only the last `limit` entries of a JSON Lines history file.
+    
+    The file is memory-mapped and scanned backwards for newlines, so the
+    cost depends on the size of the tail rather than the whole file.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            end = len(m) - (m[-1:] == b'\n')
+            start = end
+            for _ in range(limit):
+                start = m.rfind(b'\n', 0, start)
+                if start == -1:
+                    break
+            tail = m[start + 1:end]
+    
+    return [orjson.loads(line) for line in tail.split(b'\n') if line.strip()]
+
+def _atomic_write(path: Path, write):
+    """
+    Write a file through a temporary sibling and swap it into place.
+    
+    Readers see either the old or the new file, never a partial one.
+    
+    Args:
+        path: The file to write
+        write: Callable writing the contents to a binary file object
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'wb', buffering=1 << 20) as f:
+        write(f)
+    os.replace(tmp, path)
+
+# History contents at least this large are stored zlib-compressed
+_COMPRESS_MIN_BYTES = 512
+
+def _pack_history_entry(entry: dict) -> bytes:
+    """
+    Serialize a history entry as a JSON line, compressing large content into `content_z`.
+    
+    Content that isn't a string (older histories saved `None`) is stored unchanged.
+    """
+    content = entry["content"].encode() if isinstance(entry["content"], str) else b''
+    if len(content) >= _COMPRESS_MIN_BYTES:
+        entry = {key: value for key, value in entry.items() if key != "content"}
+        entry["content_z"] = base64.b64encode(zlib.compress(content)).decode()
+    return orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE)
+
+def _unpack_history_entry(entry: dict) -> dict:
+    """Restore the `content` of a history entry read back from disk."""
+    packed = entry.pop("content_z", None)
+    if packed is not None:
+        entry["content"] = zlib.decompress(base64.b64decode(packed)).decode()
+    return entry
+
+class SemanticCache:
+    """
+    Two-tier cache of generated posts keyed by topic.
+    
+    An exact tier maps the SHA-256 of the normalized topic to its post, so a
+    repeated topic is answered without an embedding call. Otherwise a topic is
+    a hit when its cosine similarity to a cached topic reaches the threshold,
+    so paraphrases of earlier topics reuse the earlier post instead of another
+    LLM round-trip. Entries are persisted in `cache_dir` (an `.npz` embedding
+    matrix plus a JSON entry list) and seeded from the history on first use.
+    """
+    
+    def __init__(self, cache_dir: Path, embed, threshold: float = 0.92, seed=None):
+        """
+        Initialize the semantic cache.
+        
+        Args:
+            cache_dir: Directory holding the cache files
+            embed: Callable mapping a list of texts to a float32 matrix
+            threshold: Minimum cosine similarity for a hit
+            seed: Callable returning history entries to seed an empty cache
+        """
+        self.cache_dir = cache_dir
+        self.embeddings_path = cache_dir / "semantic_embeddings.npz"
+        self.entries_path = cache_dir / "semantic_entries.json"
+        self.embed = embed
+        self.threshold = threshold
+        self.seed = seed
+        self.topics: List[str] = []
+        self.contents: List[str] = []
+        self.embeddings: Optional["np.ndarray"] = None
+        self.norms: Optional["np.ndarray"] = None
+        self.stats = {"hits": 0, "misses": 0}
+        self._exact = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _topic_hash(topic: str) -> str:
+        """Hash a topic after normalizing case and whitespace."""
+        return hashlib.sha256(' '.join(topic.lower().split()).encode()).hexdigest()
+    
+    def _load(self):
+        """Load the cache files, or seed them from the history, on first use."""
+        if self.embeddings is not None:
+            return
+        
+        import numpy as np
+        
+        loaded = False
+        if self.embeddings_path.exists() and self.entries_path.exists():
+            entries = orjson.loads(self.entries_path.read_bytes())
+            with np.load(self.embeddings_path) as data:
+                self.embeddings = data["embeddings"]
+            # Differing lengths mean a write was interrupted; rebuild instead
+            loaded = len(self.embeddings) == len(entries)
+        
+        if not loaded:
+            entries = [entry for entry in (self.seed() if self.seed else []) if entry.get("content")]
+            self.embeddings = self.embed([entry["topic"] for entry in entries]) if entries else np.empty((0, 0), dtype=np.float32)
+        
+        self.topics = [entry["topic"] for entry in entries]
+        self.contents = [entry["content"] for entry in entries]
+        self._exact = {self._topic_hash(topic): content for topic, content in zip(self.topics, self.contents)}
+        self.norms = np.linalg.norm(self.embeddings, axis=1) if len(self.embeddings) else np.empty(0, dtype=np.float32)
+        if entries and not loaded:
+            self._persist()
+    
+    def _persist(self):
+        """Write the cached entries and embedding matrix to the cache directory."""
+        import numpy as np
+        
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entries = orjson.dumps([
+            {"topic": topic, "content": content} for topic, content in zip(self.topics, self.contents)
+        ])
+        _atomic_write(self.embeddings_path, lambda f: np.savez(f, embeddings=self.embeddings))
+        _atomic_write(self.entries_path, lambda f: f.write(entries))
+    
+    def lookup(self, topic: str) -> Tuple[Optional[str], Optional["np.ndarray"]]:
+        """
+        Find cached content for the same or a similar topic.
+        
+        Args:
+            topic: The requested topic
+            
+        Returns:
+            Tuple[Optional[str], Optional[np.ndarray]]: Cached content on a hit
+                (otherwise None), and the topic's embedding if one was computed,
+                to pass on to `add` after a miss
+        """
+        import numpy as np
+        
+        with self._lock:
+            self._load()
+            exact = self._exact.get(self._topic_hash(topic))
+            if exact is not None:
+                self.stats["hits"] += 1
+                return exact, None
+            embeddings, norms, contents = self.embeddings, self.norms, self.contents
+        
+        query = self.embed([topic])[0]
+        if len(embeddings):
+            scores = embeddings @ query / (norms * np.linalg.norm(query))
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                with self._lock:
+                    self.stats["hits"] += 1
+                return contents[best], query
+        
+        with self._lock:
+            self.stats["misses"] += 1
+        return None, query
+    
+    def add(self, topic: str, content: str, vector: Optional["np.ndarray"] = None):
+        """
+        Add generated content to the cache.
+        
+        Args:
+            topic: The topic that was generated
+            content: The generated content
+            vector: The topic's embedding from `lookup` (embedded again if None)
+        """
+        import numpy as np
+        
+        if vector is None:
+            vector = self.embed([topic])[0]
+        
+        with self._lock:
+            self._load()
+            self.topics.append(topic)
+            self.contents.append(content)
+            self._exact[self._topic_hash(topic)] = content
+            if len(self.embeddings):
+                self.embeddings = np.vstack([self.embeddings, vector])
+            else:
+                self.embeddings = vector[np.newaxis, :]
+            self.norms = np.append(self.norms, np.linalg.norm(vector))
+            self._persist()
+
+class ResponseCache:
+    """
+    Exact-match cache of team responses, backed by SQLite.
+    
+    Keys are SHA-256 digests of the model ids, prompts and normalized topic,
+    so repeating a request with the same configuration skips the LLM entirely
+    while any prompt or model change naturally misses. The most recently used
+    entries are also kept in an in-memory LRU so repeats skip the database.
+    """
+    
+    def __init__(self, path: Path, memory_size: int = 1024):
+        """
+        Initialize the response cache.
+        
+        Args:
+            path: Location of the SQLite database
+            memory_size: Maximum number of entries kept in memory
+        """
+        self.memory_size = memory_size
+        self.stats = {"hits": 0, "misses": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, content TEXT NOT NULL)"
+        )
+        self._conn.commit()
+    
+    def _remember(self, key: str, content: str):
+        """Insert an entry into the in-memory LRU, evicting the oldest if full."""
+        self._memory[key] = content
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached content for a key, or None on a miss."""
+        with self._lock:
+            content = self._memory.get(key)
+            if content is None:
+                row = self._conn.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+                content = row[0] if row else None
+            
+            if content is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["hits"] += 1
+                self._remember(key, content)
+            return content
+    
+    def set(self, key: str, content: str):
+        """Store the content for a key, replacing any previous value."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content) VALUES (?, ?)", (key, content)
+            )
+            self._conn.commit()
+            self._remember(key, content)
+
+class HistoryBackend(ABC):
+    """
+    Storage for the content history.
+    
+    Appends come from the generator's background writer thread, reads from
+    any thread after a flush. Entries may be returned in their stored form;
+    callers restore them with `_unpack_history_entry`.
+    """
+    
+    @abstractmethod
+    def append(self, entries: List[dict]):
+        """
+        Append history entries, oldest first.
+        
+        Args:
+            entries: Entries with `timestamp`, `topic` and `content`
+        """
+    
+    @abstractmethod
+    def tail(self, limit: Optional[int] = None) -> list:
+        """
+        Return the most recent entries.
+        
+        Args:
+            limit: Number of entries to return (all entries if None)
+        
+        Returns:
+            list: The entries, oldest first
+        """
+    
+    def release(self):
+        """Release open file handles; they are reopened when next needed."""
+
+class JSONLBackend(HistoryBackend):
+    """
+    Content history as a JSON Lines file, one entry per line.
+    
+    The file stays open as an O_APPEND descriptor between appends, so each
+    batch costs a single write. Long contents are stored zlib-compressed.
+    """
+    
+    def __init__(self, path: Path, legacy_path: Optional[Path] = None):
+        """
+        Initialize the JSON Lines backend.
+        
+        Args:
+            path: Location of the `.jsonl` file
+            legacy_path: Legacy `content_history.json` to migrate on first use
+        """
+        self.path = path
+        self._fd = None
+        if legacy_path is not None:
+            self._migrate(legacy_path)
+    
+    def _migrate(self, legacy_path: Path):
+        """
+        Convert a legacy JSON history file to JSON Lines.
+        
+        Runs once: the legacy file is kept with a `.bak` suffix.
+        """
+        if not legacy_path.exists() or self.path.exists():
+            return
+        
+        history = orjson.loads(legacy_path.read_bytes())
+        packed = b''.join(_pack_history_entry(entry) for entry in history)
+        _atomic_write(self.path, lambda f: f.write(packed))
+        
+        legacy_path.rename(legacy_path.with_name(legacy_path.name + ".bak"))
+    
+    def append(self, entries: List[dict]):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        data = memoryview(b''.join(_pack_history_entry(entry) for entry in entries))
+        while data:
+            data = data[os.write(self._fd, data):]
+    
+    def tail(self, limit: Optional[int] = None) -> list:
+        if not self.path.exists():
+            return []
+        if limit:
+            return _read_history_tail(self.path, limit)
+        with open(self.path, 'rb') as f:
+            return [orjson.loads(line) for line in f if line.strip()]
+    
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+class SQLiteBackend(HistoryBackend):
+    """
+    Content history in an SQLite database in WAL mode.
+    
+    Appends are single transactions that don't block readers, and reading
+    the most recent entries doesn't scan the whole history.
+    """
+    
+    def __init__(self, path: Path):
+        """
+        Initialize the SQLite backend.
+        
+        Args:
+            path: Location of the SQLite database
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Return the open connection, opening it and creating the table if needed."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS history (timestamp TEXT NOT NULL, topic TEXT NOT NULL, content TEXT NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+    
+    def is_empty(self) -> bool:
+        """Return whether the history table has no entries."""
+        with self._lock:
+            return self._connect().execute("SELECT 1 FROM history LIMIT 1").fetchone() is None
+    
+    def append(self, entries: List[dict]):
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT INTO history (timestamp, topic, content) VALUES (?, ?, ?)",
+                [(entry["timestamp"], entry["topic"], entry["content"]) for entry in entries]
+            )
+            conn.commit()
+    
+    def tail(self, limit: Optional[int] = None) -> list:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT timestamp, topic, content FROM history ORDER BY rowid DESC LIMIT ?",
+                (limit or -1,)
+            ).fetchall()
+        return [{"timestamp": timestamp, "topic": topic, "content": content} for timestamp, topic, content in reversed(rows)]
+    
+    def release(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+@functools.cache
+def _file_tools(base_dir: Path) -> "FileTools":
+    """Return the FileTools toolkit for an output directory, shared by every team writing there."""
+    from agno.tools.file import FileTools
+    
+    return FileTools(base_dir=base_dir)
 
 class InstagramContentGenerator:
     """
@@ -32,24 +516,106 @@ class InstagramContentGenerator:
     Instagram posts with accompanying image generation prompts.
     """
     
-    def __init__(self, gemini_api_key: str, output_dir: str = "./output"):
+    def __init__(
+        self,
+        gemini_api_key: str,
+        output_dir: str = "./output",
+        semantic_cache: bool = False,
+        semantic_threshold: float = 0.92,
+        monitoring: Optional[bool] = None
+    ):
         """
         Initialize the Instagram Content Generator.
         
         Args:
             gemini_api_key: API key for Google Gemini LLM
             output_dir: Directory to save generated content files
+            semantic_cache: Whether to reuse saved posts for similar topics
+            semantic_threshold: Minimum cosine similarity for a semantic cache hit
+            monitoring: Whether to send team runs to agno monitoring
+                (defaults to the AGNO_MONITORING environment variable, off if unset)
         """
         self.gemini_api_key = gemini_api_key
+        self.monitoring = (
+            monitoring if monitoring is not None
+            else os.getenv("AGNO_MONITORING", "").lower() in ("1", "true")
+        )
         self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(exist_ok=True)
+        if not self.output_dir.exists():
+            self.output_dir.mkdir(exist_ok=True)
+        self._history_backend = self._create_history_backend()
+        
+        # History entries are appended by a background writer thread and kept
+        # in memory once the history has been read
+        self._history: Optional[list] = None
+        self._history_lock = threading.Lock()
+        self._write_queue = queue.Queue()
+        self._writer_error = None
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
         
-        # Initialize the agents
-        self.writer_agent = self._create_writer_agent()
-        self.illustrator_agent = self._create_illustrator_agent()
-        self.content_team = self._create_content_team()
+        self._client = None
+        self.semantic_cache = SemanticCache(
+            self.output_dir / "cache",
+            embed=self._embed_texts,
+            threshold=semantic_threshold,
+            seed=self.get_content_history
+        ) if semantic_cache else None
+    
+    # The response cache, models, agents and team are built on first use, so
+    # history-only callers never open the cache or import agno or google-genai
+    
+    @functools.cached_property
+    def response_cache(self) -> ResponseCache:
+        """The exact-match cache of team responses."""
+        return ResponseCache(self.output_dir / "llm_cache.sqlite3")
+    
+    @functools.cached_property
+    def _flash(self) -> "Gemini":
+        """The gemini-2.0-flash model shared by the Illustrator and the team."""
+        from agno.models.google import Gemini
+        
+        return Gemini(id="gemini-2.0-flash", api_key=self.gemini_api_key, client=self._genai_client())
+    
+    @functools.cached_property
+    def _flash_lite(self) -> "Gemini":
+        """The gemini-2.0-flash-lite model shared by the Writers."""
+        from agno.models.google import Gemini
+        
+        return Gemini(id="gemini-2.0-flash-lite", api_key=self.gemini_api_key, client=self._genai_client())
+    
+    @functools.cached_property
+    def search_tools(self) -> "CoalescingDuckDuckGoTools":
+        """Search toolkit shared by all Writers, so concurrent runs reuse each other's results."""
+        from search_tools import CoalescingDuckDuckGoTools
+        
+        return CoalescingDuckDuckGoTools()
+    
+    @functools.cached_property
+    def writer_agent(self) -> "Agent":
+        """The generator's Writer agent."""
+        return self._create_writer_agent()
+    
+    @functools.cached_property
+    def illustrator_agent(self) -> "Agent":
+        """The generator's Illustrator agent."""
+        return self._create_illustrator_agent()
+    
+    @functools.cached_property
+    def content_team(self) -> "Team":
+        """The generator's coordinating team."""
+        return self._create_content_team()
+    
+    @functools.cached_property
+    def _cache_fingerprint(self) -> str:
+        """Models and prompts of the team, folded into every response cache key."""
+        return "|".join(map(str, [
+            self.writer_agent.model.id, self.writer_agent.role, self.writer_agent.description,
+            self.illustrator_agent.model.id, self.illustrator_agent.role, self.illustrator_agent.description,
+            self.content_team.model.id, self.content_team.instructions
+        ]))
     
-    def _create_writer_agent(self) -> Agent:
+    def _create_writer_agent(self) -> "Agent":
         """
         Create the Writer agent specialized in Instagram content creation.
         
@@ -60,33 +626,21 @@ class InstagramContentGenerator:
         Returns:
             Agent: Configured writer agent
         """
+        from agno.agent import Agent
+        
         return Agent(
             name="Writer",
-            role=dedent("""\
-                You are an experienced digital marketer who specializes in Instagram posts.
-                You know how to write an engaging, SEO-friendly post.
-                You know all about wine, cheese, and gourmet foods found in grocery stores.
-                You are also a wine sommelier who knows how to make recommendations.
-                """),
-            description=dedent("""\
-                Write clear, engaging content using a neutral to fun and conversational tone.
-                Write an Instagram caption about the requested {topic}.
-                Write a short call to action at the end of the message.
-                Add 5 hashtags to the caption.
-                If you encounter a character encoding error, remove the character before sending your response to the Coordinator.
-                """),
-            tools=[DuckDuckGoTools()],
+            role=_WRITER_ROLE,
+            description=_WRITER_DESC,
+            tools=[self.search_tools],
             add_name_to_instructions=True,
-            expected_output=dedent("Caption for Instagram about the {topic}."),
-            model=Gemini(
-                id="gemini-2.0-flash-lite", 
-                api_key=self.gemini_api_key
-            ),
+            expected_output="Caption for Instagram about the requested topic.",
+            model=self._flash_lite,
             exponential_backoff=True,
             delay_between_retries=2
         )
     
-    def _create_illustrator_agent(self) -> Agent:
+    def _create_illustrator_agent(self) -> "Agent":
         """
         Create the Illustrator agent specialized in image prompt generation.
         
@@ -96,24 +650,20 @@ class InstagramContentGenerator:
         Returns:
             Agent: Configured illustrator agent
         """
+        from agno.agent import Agent
+        
         return Agent(
             name="Illustrator",
             role="You are an illustrator who specializes in pictures of wines, cheeses, and fine foods found in grocery stores.",
-            description=dedent("""\
-                Based on the caption created by Marketer, create a prompt to generate an engaging photo about the requested {topic}.
-                If you encounter a character encoding error, remove the character before sending your response to the Coordinator.
-                """),
+            description=_ILLUSTRATOR_DESC,
             expected_output="Prompt to generate a picture.",
             add_name_to_instructions=True,
-            model=Gemini(
-                id="gemini-2.0-flash", 
-                api_key=self.gemini_api_key
-            ),
+            model=self._flash,
             exponential_backoff=True,
             delay_between_retries=2
         )
     
-    def _create_content_team(self) -> Team:
+    def _create_content_team(self, members: Optional[list] = None) -> "Team":
         """
         Create the coordinating team that manages the multi-agent workflow.
         
@@ -122,102 +672,484 @@ class InstagramContentGenerator:
         2. Illustrator creates the image generation prompt
         3. Results are compiled into a structured output
         
+        The instructions are static: the topic is sent as the user message of
+        each run, so every run shares the same prompt prefix.
+        
+        Args:
+            members: Writer and Illustrator agents (defaults to this generator's agents)
+        
         Returns:
             Team: Configured team coordinator
         """
+        from agno.team import Team
+        
         return Team(
             name="Instagram Team",
             mode="coordinate",
-            members=[self.writer_agent, self.illustrator_agent],
-            instructions=dedent("""\
-                You are a team of content writers working together to create engaging Instagram posts.
-                First, you ask the 'Writer' to create a caption for the requested {topic}.
-                Next, you ask the 'Illustrator' to create a prompt to generate an engaging illustration for the requested {topic}.
-                Do not use emojis in the caption.
-                If you encounter a character encoding error, remove the character before saving the file.
-                Use the following template to generate the output:
-                - Post
-                - Prompt to generate an illustration
-                """),
-            model=Gemini(
-                id="gemini-2.0-flash", 
-                api_key=self.gemini_api_key
-            ),
-            tools=[FileTools(base_dir=self.output_dir)],
+            members=members or [self.writer_agent, self.illustrator_agent],
+            instructions=_TEAM_INSTRUCTIONS,
+            model=self._flash,
+            tools=[_file_tools(self.output_dir)],
             expected_output="A text named 'post.txt' with the content of the Instagram post and the prompt to generate a picture.",
             share_member_interactions=True,
             markdown=True,
-            monitoring=True
+            monitoring=self.monitoring
         )
     
-    def generate_content(self, topic: str, save_to_file: bool = True) -> dict:
+    def _new_content_team(self) -> "Team":
+        """
+        Create an independent team with its own Writer and Illustrator.
+        
+        Agno agents and teams keep per-run state on the instance, so concurrent
+        runs must not share one. The copies use the same static instructions,
+        which keeps the prompt prefix identical across runs.
+        
+        Returns:
+            Team: Fresh team coordinator
+        """
+        return self._create_content_team(
+            members=[self._create_writer_agent(), self._create_illustrator_agent()]
+        )
+    
+    def _genai_client(self) -> "genai.Client":
+        """Return the google-genai client shared by the models, embeddings and batch jobs."""
+        if self._client is None:
+            from google import genai
+            
+            self._client = genai.Client(api_key=self.gemini_api_key)
+        return self._client
+    
+    def _embed_texts(self, texts: List[str]) -> "np.ndarray":
+        """
+        Embed texts with the Gemini embedding model.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            np.ndarray: float32 matrix with one row per text
+        """
+        import numpy as np
+        
+        # The embedding endpoint accepts at most 100 texts per request
+        vectors = []
+        for start in range(0, len(texts), _EMBED_BATCH_SIZE):
+            result = self._genai_client().models.embed_content(
+                model="gemini-embedding-001",
+                contents=texts[start:start + _EMBED_BATCH_SIZE]
+            )
+            vectors.extend(embedding.values for embedding in result.embeddings)
+        return np.array(vectors, dtype=np.float32)
+    
+    def _cache_key(self, topic: str, batch: bool = False) -> str:
+        """Return the exact-match cache key for a topic under the team's (or the Batch API's) configuration."""
+        normalized = ' '.join(topic.lower().split())
+        fingerprint = _BATCH_FINGERPRINT if batch else self._cache_fingerprint
+        return hashlib.sha256(f"{fingerprint}|{normalized}".encode()).hexdigest()
+    
+    def _lookup_cache(self, topic: str) -> Tuple[Optional[str], Optional["np.ndarray"]]:
+        """Return cached content for the topic, if any cache holds it, and the topic's embedding if computed."""
+        cached = self.response_cache.get(self._cache_key(topic))
+        if cached is None and self.semantic_cache is not None:
+            return self.semantic_cache.lookup(topic)
+        return cached, None
+    
+    def _remember(
+        self,
+        topic: str,
+        content: str,
+        timestamp: str,
+        save_to_file: bool,
+        vector: Optional["np.ndarray"] = None,
+        batch: bool = False
+    ):
+        """Record freshly generated content in the history and caches."""
+        self.response_cache.set(self._cache_key(topic, batch), content)
+        if save_to_file:
+            self._save_content_history(topic, content, timestamp)
+            if self.semantic_cache is not None:
+                self.semantic_cache.add(topic, content, vector)
+    
+    async def _arun_team(self, topic: str, team: Optional["Team"] = None) -> str:
+        """
+        Run a team on a single topic using the async Agno API.
+        
+        Args:
+            topic: The topic for the Instagram post
+            team: Team to run (defaults to the generator's own team)
+            
+        Returns:
+            str: The team's final response
+            
+        Raises:
+            RuntimeError: If the team's response has no text
+        """
+        team = team or self.content_team
+        response = await team.arun(topic)
+        if not isinstance(response.content, str):
+            raise RuntimeError(f"The team returned no text for topic: {topic}")
+        return response.content
+    
+    def generate_content(self, topic: str, save_to_file: bool = True, no_cache: bool = False) -> dict:
         """
         Generate Instagram content for a given topic.
         
         Args:
             topic: The topic for the Instagram post (should be related to wine/food)
             save_to_file: Whether to save the output to a file
+            no_cache: Whether to skip cached responses and force regeneration
             
         Returns:
             dict: Generated content with post and image prompt
         """
-        print(f"🚀 Generating Instagram content for topic: {topic}")
-        print("📝 Writer agent is researching and creating caption...")
-        print("🎨 Illustrator agent is creating image prompt...")
+        timestamp = datetime.now().isoformat()
         
-        # Generate the content using the team
-        response = self.content_team.print_response(topic)
+        cached, vector = (None, None) if no_cache else self._lookup_cache(topic)
+        if cached is not None:
+            logger.info("♻️  Reusing saved content for topic: %s", topic)
+            # Show the post and refresh post.txt, as a team run would
+            sys.stdout.write(cached)
+            print()
+            (self.output_dir / "post.txt").write_text(cached, encoding='utf-8')
+            return {
+                "topic": topic,
+                "timestamp": timestamp,
+                "content": cached,
+                "cached": True
+            }
         
-        if save_to_file:
-            self._save_content_history(topic, response)
+        logger.info("🚀 Generating Instagram content for topic: %s", topic)
+        logger.info("📝 Writer agent is researching and creating caption...")
+        logger.info("🎨 Illustrator agent is creating image prompt...")
+        
+        from agno.run.team import TeamRunEvent
+        
+        # Stream the team's answer as it is generated
+        buffer = io.StringIO()
+        for chunk in self.content_team.run(topic, stream=True):
+            if chunk.event == TeamRunEvent.run_response_content.value and isinstance(chunk.content, str):
+                sys.stdout.write(chunk.content)
+                sys.stdout.flush()
+                buffer.write(chunk.content)
+        print()
+        response = buffer.getvalue()
+        
+        self._remember(topic, response, timestamp, save_to_file, vector)
         
         return {
             "topic": topic,
-            "timestamp": datetime.now().isoformat(),
-            "content": response
+            "timestamp": timestamp,
+            "content": response,
+            "cached": False
         }
     
-    def _save_content_history(self, topic: str, content: str):
+    async def agenerate_content(self, topic: str, save_to_file: bool = True, no_cache: bool = False) -> dict:
         """
-        Save content generation history to a JSON file.
+        Generate Instagram content for a given topic without blocking the event loop.
+        
+        The topic runs on a fresh team, so several calls can be awaited
+        concurrently; nothing is printed while it runs.
+        
+        Args:
+            topic: The topic for the Instagram post (should be related to wine/food)
+            save_to_file: Whether to save the output to the content history
+            no_cache: Whether to skip cached responses and force regeneration
+            
+        Returns:
+            dict: Generated content with post and image prompt
+        """
+        timestamp = datetime.now().isoformat()
+        
+        cached, vector = (None, None) if no_cache else await asyncio.to_thread(self._lookup_cache, topic)
+        if cached is not None:
+            return {
+                "topic": topic,
+                "timestamp": timestamp,
+                "content": cached,
+                "cached": True
+            }
+        
+        response = await self._arun_team(topic, self._new_content_team())
+        # Storing may embed the topic and rewrite the cache files
+        await asyncio.to_thread(self._remember, topic, response, timestamp, save_to_file, vector)
+        
+        return {
+            "topic": topic,
+            "timestamp": timestamp,
+            "content": response,
+            "cached": False
+        }
+    
+    async def generate_content_batch(
+        self,
+        topics: List[str],
+        save_to_file: bool = True,
+        concurrency: int = 4,
+        no_cache: bool = False
+    ) -> list:
+        """
+        Generate Instagram content for several topics concurrently.
+        
+        The first topic runs on its own so Gemini sees the shared instruction
+        prefix once before the remaining topics are fanned out; at most
+        `concurrency` team runs are in flight at any time.
+        
+        Args:
+            topics: The topics for the Instagram posts
+            save_to_file: Whether to save the outputs to the content history
+            concurrency: Maximum number of concurrent team runs
+            no_cache: Whether to skip cached responses and force regeneration
+            
+        Returns:
+            list: Generated content dicts, in the same order as `topics`
+        """
+        if not topics:
+            return []
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def generate(topic: str) -> dict:
+            async with semaphore:
+                return await self.agenerate_content(topic, save_to_file, no_cache)
+        
+        first = await generate(topics[0])
+        rest = await asyncio.gather(*(generate(topic) for topic in topics[1:]))
+        return [first, *rest]
+    
+    def _run_batch_job(self, model: str, system_instruction: str, prompts: List[str], poll_interval: float) -> List[str]:
+        """
+        Run prompts through the Gemini Batch API and wait for the answers.
+        
+        Args:
+            model: Gemini model id
+            system_instruction: System instruction shared by every request
+            prompts: One user prompt per request
+            poll_interval: Seconds between job status checks
+            
+        Returns:
+            List[str]: The model's answers, in the same order as `prompts`
+            
+        Raises:
+            RuntimeError: If the job or one of its requests fails
+        """
+        client = self._genai_client()
+        requests = b''.join(
+            orjson.dumps({
+                "key": str(i),
+                "request": {
+                    "system_instruction": {"parts": [{"text": system_instruction}]},
+                    "contents": [{"role": "user", "parts": [{"text": prompt}]}]
+                }
+            }, option=orjson.OPT_APPEND_NEWLINE)
+            for i, prompt in enumerate(prompts)
+        )
+        uploaded = client.files.upload(
+            file=io.BytesIO(requests),
+            config={"display_name": f"instagram-{model}-requests", "mime_type": "jsonl"}
+        )
+        
+        job = client.batches.create(model=model, src=uploaded.name, config={"display_name": f"instagram-{model}"})
+        while job.state.name not in _BATCH_DONE_STATES:
+            time.sleep(poll_interval)
+            job = client.batches.get(name=job.name)
+        if job.state.name != "JOB_STATE_SUCCEEDED":
+            raise RuntimeError(f"Batch job {job.name} ended in state {job.state.name}")
+        
+        answers = {}
+        for line in client.files.download(file=job.dest.file_name).splitlines():
+            if not line.strip():
+                continue
+            result = orjson.loads(line)
+            if "response" not in result:
+                raise RuntimeError(f"Batch request {result.get('key')} failed: {result.get('error')}")
+            parts = result["response"]["candidates"][0]["content"]["parts"]
+            answers[result["key"]] = ''.join(part.get("text", "") for part in parts).strip()
+        return [answers[str(i)] for i in range(len(prompts))]
+    
+    def generate_batch(self, topics: List[str], save_to_file: bool = True, poll_interval: float = 30) -> list:
+        """
+        Generate Instagram content for several topics with the Gemini Batch API.
+        
+        Batch requests cost half as much as real-time ones but can take up to
+        24 hours. Captions are written in one batch job and image prompts in a
+        second one; the batch endpoint cannot run tools, so the writer works
+        without web search. Topics already in the cache are not resubmitted;
+        batch posts are cached apart from team posts, so `generate_content`
+        never returns them.
+        
+        Args:
+            topics: The topics for the Instagram posts
+            save_to_file: Whether to save the outputs to the content history
+            poll_interval: Seconds between job status checks
+            
+        Returns:
+            list: Generated content dicts, in the same order as `topics`
+        """
+        timestamp = datetime.now().isoformat()
+        cached = {}
+        for topic in topics:
+            content = self.response_cache.get(self._cache_key(topic, batch=True))
+            cached[topic] = content if content is not None else self._lookup_cache(topic)[0]
+        pending = [topic for topic in dict.fromkeys(topics) if cached[topic] is None]
+        
+        if pending:
+            logger.info("📦 Submitting %d topic(s) to the Gemini Batch API...", len(pending))
+            captions = self._run_batch_job(
+                "gemini-2.0-flash-lite", f"{_WRITER_ROLE}\n{_WRITER_DESC}",
+                [f"Write an Instagram caption about: {topic}" for topic in pending], poll_interval
+            )
+            logger.info("🎨 Captions ready, submitting image prompts...")
+            image_prompts = self._run_batch_job(
+                "gemini-2.0-flash", _ILLUSTRATOR_DESC,
+                [f"Topic: {topic}\n\nCaption:\n{caption}" for topic, caption in zip(pending, captions)],
+                poll_interval
+            )
+            for topic, caption, image_prompt in zip(pending, captions, image_prompts):
+                content = f"- Post\n{caption}\n- Prompt to generate an illustration\n{image_prompt}"
+                self._remember(topic, content, timestamp, save_to_file, batch=True)
+                cached[topic] = content
+        
+        return [
+            {
+                "topic": topic,
+                "timestamp": timestamp,
+                "content": cached[topic],
+                "cached": topic not in pending
+            }
+            for topic in topics
+        ]
+    
+    def _create_history_backend(self) -> HistoryBackend:
+        """
+        Create the history backend selected by the HISTORY_BACKEND environment variable.
+        
+        `jsonl` (the default) keeps the history in `content_history.jsonl`;
+        `sqlite` keeps it in `content_history.sqlite3`, importing any existing
+        JSON Lines history the first time.
+        """
+        jsonl = JSONLBackend(
+            self.output_dir / "content_history.jsonl",
+            legacy_path=self.output_dir / "content_history.json"
+        )
+        if os.getenv("HISTORY_BACKEND", "jsonl").lower() != "sqlite":
+            return jsonl
+        
+        backend = SQLiteBackend(self.output_dir / "content_history.sqlite3")
+        if backend.is_empty():
+            existing = [_unpack_history_entry(entry) for entry in jsonl.tail()]
+            for entry in existing:
+                # Older histories saved `None` content, which the table doesn't allow
+                if entry["content"] is None:
+                    entry["content"] = ""
+            if existing:
+                backend.append(existing)
+        return backend
+    
+    def _save_content_history(self, topic: str, content: str, timestamp: Optional[str] = None):
+        """
+        Queue a content generation entry for the history.
+        
+        The entry is written by the background writer thread; call `flush()`
+        to wait until it is stored.
         
         Args:
             topic: The topic that was generated
             content: The generated content
-        """
-        history_file = self.output_dir / "content_history.json"
+            timestamp: ISO timestamp of the generation (defaults to now)
         
-        # Load existing history or create new
-        if history_file.exists():
-            with open(history_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
-        else:
-            history = []
+        Raises:
+            TypeError: If the content is not a string
+        """
+        if not isinstance(content, str):
+            raise TypeError(f"History content must be a string, got {type(content).__name__}")
         
-        # Add new entry
-        history.append({
-            "timestamp": datetime.now().isoformat(),
+        entry = {
+            "timestamp": timestamp or datetime.now().isoformat(),
             "topic": topic,
             "content": content
-        })
+        }
+        with self._history_lock:
+            if self._history is not None:
+                self._history.append(entry)
+            self._write_queue.put(entry)
+    
+    def _writer_loop(self):
+        """
+        Append queued history entries, batching whatever is pending into one write.
         
-        # Save updated history
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(history, f, indent=2, ensure_ascii=False)
+        `flush()` queues a marker after which the backend releases its open
+        file handles.
+        """
+        while True:
+            items = [self._write_queue.get()]
+            while True:
+                try:
+                    items.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            entries = [item for item in items if item is not _CLOSE_HISTORY]
+            try:
+                if entries:
+                    self._history_backend.append(entries)
+            except Exception as e:
+                # Keep the thread alive, or every later flush() would block forever
+                self._writer_error = e
+            finally:
+                if len(entries) < len(items) or self._writer_error:
+                    self._history_backend.release()
+                for _ in items:
+                    self._write_queue.task_done()
     
-    def get_content_history(self) -> list:
+    def flush(self):
+        """
+        Wait until all queued history entries have been written.
+        
+        Raises:
+            Exception: The error the background writer hit while storing an entry
+                (typically OSError or sqlite3.Error)
+        """
+        self._write_queue.put(_CLOSE_HISTORY)
+        self._write_queue.join()
+        
+        error, self._writer_error = self._writer_error, None
+        if error is not None:
+            raise error
+    
+    def get_content_history(self, limit: Optional[int] = None) -> list:
         """
         Retrieve the history of generated content.
         
+        The history is read once; later saves are appended to the in-memory
+        copy, so repeated calls don't touch the disk. Until then a limited
+        read only fetches the most recent entries.
+        
+        Args:
+            limit: Only return the most recent `limit` entries
+        
         Returns:
-            list: List of previously generated content entries
+            list: List of previously generated content entries, oldest first
         """
-        history_file = self.output_dir / "content_history.json"
+        with self._history_lock:
+            if self._history is None and limit:
+                # Only the tail is needed, so don't load the whole history yet
+                self.flush()
+                return [_unpack_history_entry(entry) for entry in self._history_backend.tail(limit)]
+            
+            if self._history is None:
+                self.flush()
+                self._history = self._history_backend.tail()
+            entries = self._history[-limit:] if limit else list(self._history)
         
-        if history_file.exists():
-            with open(history_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+        # Copies, so callers can't alter the stored history
+        return [_unpack_history_entry(dict(entry)) for entry in entries]
+
+@functools.cache
+def _load_env():
+    """Load environment variables from the .env file (once per process)."""
+    from dotenv import load_dotenv
+    
+    load_dotenv()
 
 def setup_environment():
     """
@@ -226,6 +1158,8 @@ def setup_environment():
     Returns:
         str: The Gemini API key from environment variables
     """
+    _load_env()  # take environment variables from .env file
+    
     # Check for required API key
     api_key = os.environ.get("GEMINI_API_KEY")
     if not api_key:
@@ -234,10 +1168,57 @@ def setup_environment():
             "Please set it in your .env file or environment."
         )
     
-    print("✅ Environment setup complete!")
-    print("🤖 Multi-Agent Instagram Content Generator ready!")
+    logger.debug("API key loaded (length %d)", len(api_key))
+    logger.info("✅ Environment setup complete!")
+    logger.info("🤖 Multi-Agent Instagram Content Generator ready!")
     return api_key
 
+# Common instruction words stripped from prompts to isolate the topic
+_INSTRUCTION_WORDS = frozenset({
+    'create', 'generate', 'write', 'make', 'build', 'post', 'about',
+    'for', 'instagram', 'content', 'caption', 'image', 'prompt'
+})
+
+# Keyword tables for prompt parsing, in priority order
+_STYLE_KEYWORDS = {
+    'casual': ['casual', 'relaxed', 'laid-back', 'informal'],
+    'professional': ['professional', 'formal', 'business', 'corporate'],
+    'fun': ['fun', 'playful', 'energetic', 'vibrant', 'exciting'],
+    'elegant': ['elegant', 'sophisticated', 'classy', 'refined'],
+    'educational': ['educational', 'informative', 'teaching', 'learning']
+}
+
+_REQUIREMENT_PATTERNS = {
+    'no_emojis': ['no emoji', 'without emoji', 'no emojis'],
+    'include_cta': ['call to action', 'cta', 'include cta'],
+    'short_format': ['short', 'brief', 'concise', 'quick'],
+    'long_format': ['detailed', 'long', 'comprehensive', 'in-depth'],
+    'hashtags': ['hashtag', 'tags', '#'],
+    'story_format': ['story', 'narrative', 'storytelling']
+}
+
+def _compile_keyword_matcher(table: dict):
+    """
+    Compile a keyword table into a single regex matched in one pass.
+    
+    The alternation is wrapped in a lookahead so matches are zero-width and
+    overlapping keywords are all reported, like plain substring checks.
+    
+    Returns:
+        tuple: Compiled pattern and a keyword -> label mapping
+    """
+    labels = {keyword: label for label, keywords in table.items() for keyword in keywords}
+    alternatives = '|'.join(re.escape(keyword) for keyword in sorted(labels, key=len, reverse=True))
+    return re.compile(f'(?=({alternatives}))'), labels
+
+# Styles are matched on whole words, so e.g. "unprofessional" isn't "professional"
+_KW_TO_STYLE = {keyword: style for style, keywords in _STYLE_KEYWORDS.items() for keyword in keywords}
+_WORD_RE = re.compile(r'[a-z-]+')
+
+_NO_SAVE_RE = re.compile(r"no save|don't save")
+
+_REQUIREMENT_MATCHER, _REQUIREMENT_LABELS = _compile_keyword_matcher(_REQUIREMENT_PATTERNS)
+
 class PromptInterface:
     """
     Advanced prompt interface for receiving detailed instructions and prompts.
@@ -282,79 +1263,61 @@ class PromptInterface:
         Returns:
             dict: Structured instruction parameters
         """
-        prompt_lower = prompt.lower()
-        
-        # Extract topic (main content focus)
-        topic = self._extract_topic(prompt)
-        
-        # Extract style preferences
-        style = self._extract_style(prompt_lower)
-        
-        # Extract special requirements
-        requirements = self._extract_requirements(prompt_lower)
+        topic, style, requirements, save_file = _parse_instruction_cached(prompt)
         
         return {
             'topic': topic,
             'style': style,
-            'requirements': requirements,
-            'save_file': 'no save' not in prompt_lower and 'don\'t save' not in prompt_lower
+            'requirements': list(requirements),
+            'save_file': save_file
         }
     
-    def _extract_topic(self, prompt: str) -> str:
+    @staticmethod
+    def _extract_topic(prompt: str) -> str:
         """Extract the main topic from the prompt."""
-        # Remove common instruction words to isolate the topic
-        instruction_words = [
-            'create', 'generate', 'write', 'make', 'build', 'post', 'about',
-            'for', 'instagram', 'content', 'caption', 'image', 'prompt'
-        ]
-        
+        # Remove common instruction words to isolate the topic;
+        # if no specific topic is found, use the full prompt
         words = prompt.split()
-        topic_words = []
-        
-        for word in words:
-            if word.lower() not in instruction_words:
-                topic_words.append(word)
-        
-        # If no specific topic found, use the full prompt
-        if not topic_words:
-            return prompt
-        
-        return ' '.join(topic_words)
-    
-    def _extract_style(self, prompt_lower: str) -> str:
-        """Extract style preferences from the prompt."""
-        style_keywords = {
-            'casual': ['casual', 'relaxed', 'laid-back', 'informal'],
-            'professional': ['professional', 'formal', 'business', 'corporate'],
-            'fun': ['fun', 'playful', 'energetic', 'vibrant', 'exciting'],
-            'elegant': ['elegant', 'sophisticated', 'classy', 'refined'],
-            'educational': ['educational', 'informative', 'teaching', 'learning']
-        }
-        
-        for style, keywords in style_keywords.items():
-            if any(keyword in prompt_lower for keyword in keywords):
+        return ' '.join(
+            word for word, lowered in zip(words, prompt.lower().split())
+            if lowered not in _INSTRUCTION_WORDS
+        ) or prompt
+    
+    @staticmethod
+    def _extract_style(prompt_lower: str) -> str:
+        """Extract style preferences from the prompt (the first style word wins)."""
+        for word in _WORD_RE.findall(prompt_lower):
+            style = _KW_TO_STYLE.get(word)
+            if style:
                 return style
         
         return 'conversational'  # default style
     
-    def _extract_requirements(self, prompt_lower: str) -> list:
+    @staticmethod
+    def _extract_requirements(prompt_lower: str) -> list:
         """Extract special requirements from the prompt."""
-        requirements = []
-        
-        requirement_patterns = {
-            'no_emojis': ['no emoji', 'without emoji', 'no emojis'],
-            'include_cta': ['call to action', 'cta', 'include cta'],
-            'short_format': ['short', 'brief', 'concise', 'quick'],
-            'long_format': ['detailed', 'long', 'comprehensive', 'in-depth'],
-            'hashtags': ['hashtag', 'tags', '#'],
-            'story_format': ['story', 'narrative', 'storytelling']
-        }
-        
-        for req, patterns in requirement_patterns.items():
-            if any(pattern in prompt_lower for pattern in patterns):
-                requirements.append(req)
+        found = {_REQUIREMENT_LABELS[match.group(1)] for match in _REQUIREMENT_MATCHER.finditer(prompt_lower)}
         
-        return requirements
+        return [req for req in _REQUIREMENT_PATTERNS if req in found]
+
+@functools.lru_cache(maxsize=1024)
+def _parse_instruction_cached(prompt: str) -> tuple:
+    """
+    Parse a prompt into an immutable (topic, style, requirements, save_file) tuple.
+    
+    Parsing is pure over the prompt text, so repeated prompts skip it entirely.
+    """
+    prompt_lower = prompt.lower()
+    
+    return (
+        # Extract topic (main content focus)
+        PromptInterface._extract_topic(prompt),
+        # Extract style preferences
+        PromptInterface._extract_style(prompt_lower),
+        # Extract special requirements
+        tuple(PromptInterface._extract_requirements(prompt_lower)),
+        not _NO_SAVE_RE.search(prompt_lower)
+    )
 
 def get_multiline_input(prompt_text: str) -> str:
     """
@@ -375,13 +1338,17 @@ def get_multiline_input(prompt_text: str) -> str:
     print("   - Type 'CANCEL' to go back")
     print("-" * 50)
     
+    if not sys.stdin.isatty():
+        return _read_until_sentinel(sys.stdin)
+    
     lines = []
     while True:
         try:
             line = input()
-            if line.strip().upper() == 'END':
+            command = line.strip().upper()
+            if command == 'END':
                 break
-            elif line.strip().upper() == 'CANCEL':
+            elif command == 'CANCEL':
                 return None
             lines.append(line)
         except KeyboardInterrupt:
@@ -389,144 +1356,327 @@ def get_multiline_input(prompt_text: str) -> str:
     
     return '\n'.join(lines).strip()
 
+def _read_until_sentinel(stream) -> Optional[str]:
+    """
+    Read piped multiline input up to an END or CANCEL line.
+    
+    Lines come straight from the stream's buffer instead of one `input()`
+    call each, and reading stops at the sentinel so any input after it is
+    left for the menu.
+    
+    Args:
+        stream: Text stream to read from
+        
+    Returns:
+        str: The input before the sentinel, or None if cancelled
+    """
+    lines = []
+    for line in stream:
+        command = line.strip().upper()
+        if command == 'END':
+            break
+        elif command == 'CANCEL':
+            return None
+        lines.append(line)
+    
+    return ''.join(lines).strip()
+
+async def _run_in_daemon_thread(func, *args):
+    """
+    Await a blocking call running in a daemon thread.
+    
+    Unlike `asyncio.to_thread`, an exit (e.g. Ctrl+C) never waits for the
+    thread, which matters while it is blocked on `input()`.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def deliver(set_outcome, value):
+        if not future.done():
+            set_outcome(value)
+    
+    def run():
+        try:
+            outcome = (future.set_result, func(*args))
+        except BaseException as e:
+            outcome = (future.set_exception, e)
+        try:
+            loop.call_soon_threadsafe(deliver, *outcome)
+        except RuntimeError:
+            pass  # the event loop has already closed
+    
+    threading.Thread(target=run, daemon=True).start()
+    return await future
+
+async def _ainput(prompt_text: str = "") -> str:
+    """Read a line of input without blocking the event loop."""
+    return await _run_in_daemon_thread(input, prompt_text)
+
+def _report_generation(task: asyncio.Task):
+    """Print the outcome of a background generation started from the menu."""
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        print(f"\n❌ Error generating content: {task.exception()}")
+        return
+    
+    result = task.result()
+    print(f"\n✅ Content ready for topic: {result['topic']}{' (reused)' if result['cached'] else ''}")
+    print(result['content'])
+
+class MenuSession:
+    """
+    Generator state for the interactive menu, built on first use.
+    
+    Creating the generator imports the agno stack, so menu options that only
+    show examples or help never construct it.
+    """
+    
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self.pending: Set[asyncio.Task] = set()
+        self._generator = None
+        self._prompt_interface = None
+    
+    @property
+    def generator(self) -> InstagramContentGenerator:
+        """The content generator, created on first access."""
+        if self._generator is None:
+            self._generator = InstagramContentGenerator(self.api_key)
+        return self._generator
+    
+    @property
+    def prompt_interface(self) -> PromptInterface:
+        """The prompt interface, created on first access."""
+        if self._prompt_interface is None:
+            self._prompt_interface = PromptInterface(self.generator)
+        return self._prompt_interface
+    
+    def start_generation(self, topic: str):
+        """Generate content for a topic in the background, printing it when ready."""
+        task = asyncio.create_task(self.generator.agenerate_content(topic))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+        task.add_done_callback(_report_generation)
+    
+    async def wait_pending(self):
+        """Wait for background generations still in flight."""
+        if self.pending:
+            print(f"\n⏳ Waiting for {len(self.pending)} generation(s) to finish...")
+            await asyncio.gather(*self.pending, return_exceptions=True)
+    
+    def close(self):
+        """Flush pending history writes if a generator was created."""
+        if self._generator is not None:
+            self._generator.flush()
+
+class Example(NamedTuple):
+    """An example prompt shown by menu option 3."""
+    prompt: str
+    explanation: str
+
+_EXAMPLES = (
+    Example(
+        prompt="Create a fun and casual Instagram post about pairing Italian Chianti with aged cheese. Make it educational but keep it light and include a call to action.",
+        explanation="This specifies topic, style (fun/casual), tone (educational but light), and includes CTA requirement."
+    ),
+    Example(
+        prompt="Write an elegant and sophisticated post about summer rosé wines. Focus on French varieties and include food pairing suggestions. No emojis please.",
+        explanation="Specifies style (elegant), region focus, content type, and formatting preference."
+    ),
+    Example(
+        prompt="Generate a short and concise post about artisanal chocolate and wine pairings for beginners. Make it approachable and include hashtags.",
+        explanation="Specifies length (short), audience (beginners), tone (approachable), and hashtag requirement."
+    ),
+)
+
+# Menu texts are formatted once at import instead of on every visit
+_EXAMPLES_RENDERED = "\n".join(
+    f"\n{i}. EXAMPLE PROMPT:\n   '{example.prompt}'\n   💡 Why this works: {example.explanation}"
+    for i, example in enumerate(_EXAMPLES, 1)
+)
+
+_HELP_TEXT = dedent("""
+    🎯 HOW TO USE THE NATURAL LANGUAGE PROMPT:
+       • Be specific about your topic (wine types, food items, pairings)
+       • Mention your preferred style: casual, professional, fun, elegant
+       • Add special requirements: no emojis, include CTA, short/long format
+       • Specify your target audience: beginners, experts, general audience
+
+    📝 PROMPT STRUCTURE EXAMPLES:
+       'Create a [STYLE] post about [TOPIC] for [AUDIENCE] with [REQUIREMENTS]'
+       'Write [LENGTH] content about [TOPIC] that is [TONE] and includes [ELEMENTS]'
+
+    🎨 AVAILABLE STYLES:
+       • Casual/Relaxed • Professional/Formal • Fun/Playful
+       • Elegant/Sophisticated • Educational/Informative
+
+    📋 SPECIAL REQUIREMENTS:
+       • No emojis • Include call-to-action • Short/Brief format
+       • Long/Detailed format • Include hashtags • Story format""")
+
+async def handle_nlp(session: MenuSession):
+    """Menu option 1: generate content from a natural language prompt."""
+    # Ctrl+C only reaches the main thread, so the prompt is read here with the
+    # default handler: it cancels the prompt instead of the whole menu.
+    # Background generations pause while the prompt is being typed.
+    previous_handler = signal.signal(signal.SIGINT, signal.default_int_handler)
+    try:
+        user_prompt = get_multiline_input(
+            "🗣️  NATURAL LANGUAGE PROMPT MODE\n"
+            "Tell me exactly what you want - I'll understand your instructions:"
+        )
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+    
+    if user_prompt:
+        print("\n🔄 Processing your instruction...")
+        print(f"📝 Your prompt: {user_prompt[:100]}{'...' if len(user_prompt) > 100 else ''}")
+        
+        try:
+            # Streams to the terminal; background generations keep running meanwhile
+            result = await _run_in_daemon_thread(session.prompt_interface.process_prompt, user_prompt)
+            print(f"\n✅ Content generated successfully!")
+            print(f"🎯 Interpreted topic: {result['parsed_instruction']['topic']}")
+            print(f"🎨 Style: {result['parsed_instruction']['style']}")
+            if result['parsed_instruction']['requirements']:
+                print(f"📋 Requirements: {', '.join(result['parsed_instruction']['requirements'])}")
+            print(f"📁 Check the '{session.generator.output_dir}' folder for saved files.")
+        except Exception as e:
+            print(f"❌ Error processing prompt: {e}")
+    else:
+        print("❌ Prompt cancelled or empty.")
+
+async def handle_quick(session: MenuSession):
+    """Menu option 2: generate content for a single topic in the background."""
+    topic = (await _ainput("\n🎯 Enter your topic (wine/food related): ")).strip()
+    if topic:
+        try:
+            session.start_generation(topic)
+            print(f"\n🚀 Generating content for '{topic}' in the background...")
+            print("💡 Queue more topics meanwhile; each post is printed when it is ready.")
+        except Exception as e:
+            print(f"❌ Error generating content: {e}")
+    else:
+        print("❌ Please enter a valid topic.")
+
+async def handle_examples(session: MenuSession):
+    """Menu option 3: show example prompts."""
+    print("\n📖 EXAMPLE PROMPTS & INSTRUCTIONS")
+    print("-" * 40)
+    print(_EXAMPLES_RENDERED)
+    
+    await _ainput("\n⏎ Press Enter to continue...")
+
+async def handle_history(session: MenuSession):
+    """Menu option 4: show the most recent content history entries."""
+    history = session.generator.get_content_history(limit=10)  # Show last 10 entries
+    if history:
+        print(f"\n📊 CONTENT HISTORY (last {len(history)} entries)")
+        print("-" * 40)
+        for i, entry in enumerate(history, 1):
+            print(f"{i:2d}. {entry['timestamp'][:19]} - {entry['topic'][:50]}{'...' if len(entry['topic']) > 50 else ''}")
+    else:
+        print("\n📊 No content history found.")
+    
+    await _ainput("\n⏎ Press Enter to continue...")
+
+async def handle_help(session: MenuSession):
+    """Menu option 5: show help and instructions."""
+    print("\n❓ HELP & INSTRUCTIONS")
+    print("=" * 30)
+    print(_HELP_TEXT)
+    
+    await _ainput("\n⏎ Press Enter to continue...")
+
+async def handle_exit(session: MenuSession) -> bool:
+    """Menu option 6: say goodbye and leave the menu."""
+    print("\n👋 Thank you for using the Instagram Content Generator!")
+    print("🍷 Keep creating amazing wine and food content!")
+    return True
+
+async def handle_invalid(session: MenuSession):
+    """Any other input: ask for a valid option."""
+    print("❌ Invalid option. Please select 1-6.")
+
+# Menu dispatch table; a handler returns True to leave the menu
+HANDLERS = {
+    "1": handle_nlp,
+    "2": handle_quick,
+    "3": handle_examples,
+    "4": handle_history,
+    "5": handle_help,
+    "6": handle_exit
+}
+
+async def amain(session: MenuSession):
+    """
+    Run the interactive menu.
+    
+    Input is read without blocking the event loop, so topics queued from the
+    quick entry option keep generating while the user works in the menu.
+    """
+    print("\n🍷 Instagram Content Generator - Advanced Prompt Interface")
+    print("=" * 65)
+    print("🤖 I can understand natural language instructions!")
+    print("📝 Tell me what kind of Instagram content you want to create.")
+    
+    # Interactive mode
+    while True:
+        print("\n" + "="*50)
+        print("📋 MAIN MENU")
+        print("="*50)
+        print("1. 💬 Natural Language Prompt (Advanced)")
+        print("2. 🎯 Quick Topic Entry")
+        print("3. 📖 Example Prompts & Instructions")
+        print("4. 📊 View Content History")
+        print("5. ❓ Help & Instructions")
+        print("6. 🚪 Exit")
+        
+        choice = (await _ainput("\n👉 Select an option (1-6): ")).strip()
+        
+        handler = HANDLERS.get(choice, handle_invalid)
+        if await handler(session):
+            break
+    
+    await session.wait_pending()
+
 def main():
     """
     Main function with enhanced prompt interface for receiving instructions.
     """
+    parser = argparse.ArgumentParser(description="Instagram Content Generator for wine and food posts")
+    parser.add_argument(
+        "--batch", nargs="+", metavar="TOPIC",
+        help="generate posts for these topics with the Gemini Batch API (half price, may take hours) and exit"
+    )
+    args = parser.parse_args()
+    
+    # Status messages go to stdout alongside the menu; LOG_LEVEL=WARNING hides them.
+    # Only this module's logger is configured, so library INFO logs stay hidden.
+    _load_env()  # LOG_LEVEL may be set in the .env file
+    log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+    if not isinstance(logging.getLevelName(log_level), int):
+        print(f"⚠️  Unknown LOG_LEVEL {log_level!r}, using INFO")
+        log_level = "INFO"
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(log_level)
+    
+    session = None
     try:
         # Setup environment
         api_key = setup_environment()
         
-        # Initialize the content generator and prompt interface
-        generator = InstagramContentGenerator(api_key)
-        prompt_interface = PromptInterface(generator)
-        
-        print("\n🍷 Instagram Content Generator - Advanced Prompt Interface")
-        print("=" * 65)
-        print("🤖 I can understand natural language instructions!")
-        print("📝 Tell me what kind of Instagram content you want to create.")
+        # The content generator and prompt interface are created on first use
+        session = MenuSession(api_key)
         
-        # Interactive mode
-        while True:
-            print("\n" + "="*50)
-            print("📋 MAIN MENU")
-            print("="*50)
-            print("1. 💬 Natural Language Prompt (Advanced)")
-            print("2. 🎯 Quick Topic Entry")
-            print("3. 📖 Example Prompts & Instructions")
-            print("4. 📊 View Content History")
-            print("5. ❓ Help & Instructions")
-            print("6. 🚪 Exit")
-            
-            choice = input("\n👉 Select an option (1-6): ").strip()
-            
-            if choice == "1":
-                # Advanced natural language prompt
-                user_prompt = get_multiline_input(
-                    "🗣️  NATURAL LANGUAGE PROMPT MODE\n"
-                    "Tell me exactly what you want - I'll understand your instructions:"
-                )
-                
-                if user_prompt:
-                    print("\n🔄 Processing your instruction...")
-                    print(f"📝 Your prompt: {user_prompt[:100]}{'...' if len(user_prompt) > 100 else ''}")
-                    
-                    try:
-                        result = prompt_interface.process_prompt(user_prompt)
-                        print(f"\n✅ Content generated successfully!")
-                        print(f"🎯 Interpreted topic: {result['parsed_instruction']['topic']}")
-                        print(f"🎨 Style: {result['parsed_instruction']['style']}")
-                        if result['parsed_instruction']['requirements']:
-                            print(f"📋 Requirements: {', '.join(result['parsed_instruction']['requirements'])}")
-                        print(f"📁 Check the '{generator.output_dir}' folder for saved files.")
-                    except Exception as e:
-                        print(f"❌ Error processing prompt: {e}")
-                else:
-                    print("❌ Prompt cancelled or empty.")
-            
-            elif choice == "2":
-                # Quick topic entry
-                topic = input("\n🎯 Enter your topic (wine/food related): ").strip()
-                if topic:
-                    try:
-                        result = generator.generate_content(topic)
-                        print(f"\n✅ Content generated successfully!")
-                        print(f"📁 Check the '{generator.output_dir}' folder for saved files.")
-                    except Exception as e:
-                        print(f"❌ Error generating content: {e}")
-                else:
-                    print("❌ Please enter a valid topic.")
-            
-            elif choice == "3":
-                # Example prompts
-                print("\n📖 EXAMPLE PROMPTS & INSTRUCTIONS")
-                print("-" * 40)
-                examples = [
-                    {
-                        "prompt": "Create a fun and casual Instagram post about pairing Italian Chianti with aged cheese. Make it educational but keep it light and include a call to action.",
-                        "explanation": "This specifies topic, style (fun/casual), tone (educational but light), and includes CTA requirement."
-                    },
-                    {
-                        "prompt": "Write an elegant and sophisticated post about summer rosé wines. Focus on French varieties and include food pairing suggestions. No emojis please.",
-                        "explanation": "Specifies style (elegant), region focus, content type, and formatting preference."
-                    },
-                    {
-                        "prompt": "Generate a short and concise post about artisanal chocolate and wine pairings for beginners. Make it approachable and include hashtags.",
-                        "explanation": "Specifies length (short), audience (beginners), tone (approachable), and hashtag requirement."
-                    }
-                ]
-                
-                for i, example in enumerate(examples, 1):
-                    print(f"\n{i}. EXAMPLE PROMPT:")
-                    print(f"   '{example['prompt']}'")
-                    print(f"   💡 Why this works: {example['explanation']}")
-                
-                input("\n⏎ Press Enter to continue...")
-            
-            elif choice == "4":
-                # Content history
-                history = generator.get_content_history()
-                if history:
-                    print(f"\n📊 CONTENT HISTORY ({len(history)} entries)")
-                    print("-" * 40)
-                    for i, entry in enumerate(history[-10:], 1):  # Show last 10 entries
-                        print(f"{i:2d}. {entry['timestamp'][:19]} - {entry['topic'][:50]}{'...' if len(entry['topic']) > 50 else ''}")
-                else:
-                    print("\n📊 No content history found.")
-                
-                input("\n⏎ Press Enter to continue...")
-            
-            elif choice == "5":
-                # Help and instructions
-                print("\n❓ HELP & INSTRUCTIONS")
-                print("=" * 30)
-                print("\n🎯 HOW TO USE THE NATURAL LANGUAGE PROMPT:")
-                print("   • Be specific about your topic (wine types, food items, pairings)")
-                print("   • Mention your preferred style: casual, professional, fun, elegant")
-                print("   • Add special requirements: no emojis, include CTA, short/long format")
-                print("   • Specify your target audience: beginners, experts, general audience")
-                
-                print("\n📝 PROMPT STRUCTURE EXAMPLES:")
-                print("   'Create a [STYLE] post about [TOPIC] for [AUDIENCE] with [REQUIREMENTS]'")
-                print("   'Write [LENGTH] content about [TOPIC] that is [TONE] and includes [ELEMENTS]'")
-                
-                print("\n🎨 AVAILABLE STYLES:")
-                print("   • Casual/Relaxed • Professional/Formal • Fun/Playful")
-                print("   • Elegant/Sophisticated • Educational/Informative")
-                
-                print("\n📋 SPECIAL REQUIREMENTS:")
-                print("   • No emojis • Include call-to-action • Short/Brief format")
-                print("   • Long/Detailed format • Include hashtags • Story format")
-                
-                input("\n⏎ Press Enter to continue...")
-            
-            elif choice == "6":
-                print("\n👋 Thank you for using the Instagram Content Generator!")
-                print("🍷 Keep creating amazing wine and food content!")
-                break
-            
-            else:
-                print("❌ Invalid option. Please select 1-6.")
+        if args.batch:
+            for result in session.generator.generate_batch(args.batch):
+                print(f"\n📌 {result['topic']}\n{result['content']}")
+        else:
+            asyncio.run(amain(session))
     
     except KeyboardInterrupt:
         print("\n\n👋 Generator stopped by user. Goodbye!")
@@ -534,7 +1684,11 @@ def main():
         print(f"\n❌ Error: {e}")
         print("💡 Make sure you have:")
         print("   - Set GEMINI_API_KEY in your environment")
-        print("   - Installed required packages: pip install agno duckduckgo-search google-genai")
+        print("   - Installed required packages: pip install agno duckduckgo-search google-genai orjson numpy cachetools python-dotenv")
+    finally:
+        # Make sure queued history entries reach the disk before exiting
+        if session is not None:
+            session.close()
 
 if __name__ == "__main__":
     main()
@@ -542,7 +1696,7 @@ if __name__ == "__main__":
 # Installation and Setup Instructions:
 """
 1. Install required packages:
-   pip install agno duckduckgo-search google-genai
+   pip install agno duckduckgo-search google-genai orjson numpy cachetools python-dotenv
 
 2. Create a .env file with your API keys:
    GEMINI_API_KEY="your_gemini_api_key_here"
@@ -559,5 +1713,5 @@ if __name__ == "__main__":
 5. Example usage:
    - Topic: "Sparkling Water and suggestion of food to accompany"
    - Output: Instagram caption + image generation prompt
-   - Saved to: ./output/post.txt and content_history.json
+   - Saved to: ./output/post.txt and content_history.jsonl
 """
\ No newline at end of file
@@ -0,0 +1,124 @@
+# Search tools shared by the Writer agents of the Instagram Content Generator
+
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Tuple
+
+import orjson
+from agno.tools.duckduckgo import DDGS, DuckDuckGoTools
+from agno.utils.log import log_debug
+from cachetools import TTLCache
+
+class CoalescingDuckDuckGoTools(DuckDuckGoTools):
+    """
+    DuckDuckGo toolkit that deduplicates searches across concurrent agents.
+    
+    Queries are canonicalized (lowercased, terms sorted) so trivially different
+    phrasings share one entry. Recent results are kept in a TTL cache, and a
+    query that is already being searched waits for that search to finish
+    instead of sending its own request.
+    """
+    
+    def __init__(self, cache_size: int = 1024, ttl: int = 3600, **kwargs):
+        """
+        Initialize the coalescing toolkit.
+        
+        Args:
+            cache_size: Maximum number of cached search results
+            ttl: Seconds a search result stays cached
+            **kwargs: Passed through to DuckDuckGoTools
+        """
+        self._results = TTLCache(maxsize=cache_size, ttl=ttl)
+        self._inflight: Dict[Tuple[str, str, int], Future] = {}
+        self._lock = threading.Lock()
+        super().__init__(**kwargs)
+    
+    @staticmethod
+    def _canonical(query: str) -> str:
+        """Normalize a query so equivalent phrasings share a cache key."""
+        return ' '.join(sorted(query.lower().split()))
+    
+    def _coalesce(self, kind: str, query: str, max_results: int, search: Callable[[str, int], str]) -> str:
+        """
+        Return a cached or in-flight result for the query, or run the search once.
+        
+        Args:
+            kind: Search type, so text and news results don't mix
+            query: The query as sent by the agent
+            max_results: The maximum number of results to return
+            search: Function performing the actual search
+        
+        Returns:
+            str: The search result
+        """
+        key = (kind, self._canonical(query), max_results)
+        
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._inflight[key] = Future()
+                owner = True
+            else:
+                owner = False
+        
+        if not owner:
+            return future.result()
+        
+        try:
+            result = search(query, max_results)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        
+        with self._lock:
+            self._results[key] = result
+            del self._inflight[key]
+        future.set_result(result)
+        return result
+    
+    def _ddgs(self) -> DDGS:
+        """Create a DDGS client with the toolkit's connection settings."""
+        return DDGS(
+            headers=self.headers, proxy=self.proxy, proxies=self.proxies, timeout=self.timeout, verify=self.verify_ssl
+        )
+    
+    def _search_text(self, query: str, max_results: int) -> str:
+        """Run a text search and serialize the results with orjson."""
+        search_query = f"{self.modifier} {query}" if self.modifier else query
+        log_debug(f"Searching DDG for: {search_query}")
+        results = self._ddgs().text(keywords=search_query, max_results=self.fixed_max_results or max_results)
+        return orjson.dumps(results, option=orjson.OPT_INDENT_2).decode()
+    
+    def _search_news(self, query: str, max_results: int) -> str:
+        """Run a news search and serialize the results with orjson."""
+        log_debug(f"Searching DDG news for: {query}")
+        results = self._ddgs().news(keywords=query, max_results=self.fixed_max_results or max_results)
+        return orjson.dumps(results, option=orjson.OPT_INDENT_2).decode()
+    
+    def duckduckgo_search(self, query: str, max_results: int = 5) -> str:
+        """Use this function to search DuckDuckGo for a query.
+        
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+        
+        Returns:
+            The result from DuckDuckGo.
+        """
+        return self._coalesce("text", query, max_results, self._search_text)
+    
+    def duckduckgo_news(self, query: str, max_results: int = 5) -> str:
+        """Use this function to get the latest news from DuckDuckGo.
+        
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+        
+        Returns:
+            The latest news from DuckDuckGo.
+        """
+        return self._coalesce("news", query, max_results, self._search_news)
@@ -1,6 +1,10 @@
+import threading
+import time
 import pytest
 from unittest.mock import Mock, patch
+import json
 from app import InstagramContentGenerator
+from search_tools import CoalescingDuckDuckGoTools
 
 def test_writer_agent_creation(content_generator):
     """Test that the writer agent is created with correct configuration."""
@@ -29,9 +33,18 @@ def test_content_team_creation(content_generator):
     assert team.name == "Instagram Team"
     assert team.mode == "coordinate"
     assert len(team.members) == 2
-    assert team.monitoring is True
+    assert team.monitoring is False
     assert team.markdown is True
 
+def test_content_team_monitoring_opt_in(test_output_dir, mock_gemini_api_key, monkeypatch):
+    """Test that monitoring is enabled explicitly or through AGNO_MONITORING."""
+    monitored = InstagramContentGenerator(mock_gemini_api_key, output_dir=str(test_output_dir), monitoring=True)
+    assert monitored.content_team.monitoring is True
+    assert monitored._new_content_team().monitoring is True
+    
+    monkeypatch.setenv("AGNO_MONITORING", "true")
+    assert InstagramContentGenerator(mock_gemini_api_key, output_dir=str(test_output_dir)).monitoring is True
+
 @patch('agno.agent.Agent')
 def test_writer_agent_response(mock_agent, content_generator, sample_topic):
     """Test that the writer agent generates appropriate content."""
@@ -54,12 +67,72 @@ def test_illustrator_agent_response(mock_agent, content_generator, sample_topic)
     assert isinstance(response, str)
     assert len(response) > 0
 
-def test_agent_error_handling(content_generator, sample_topic):
+def test_agent_error_handling(content_generator, sample_topic, test_output_dir):
     """Test that agents handle errors gracefully."""
     with pytest.raises(Exception):
         # Test with invalid API key
         invalid_generator = InstagramContentGenerator(
             gemini_api_key="invalid_key",
-            output_dir="./test_output"
+            output_dir=str(test_output_dir)
         )
-        invalid_generator.generate_content(sample_topic) 
\ No newline at end of file
+        invalid_generator.generate_content(sample_topic) 
+
+def test_writer_search_tools_shared(content_generator):
+    """Test that batch teams share the generator's coalescing search toolkit."""
+    team = content_generator._new_content_team()
+    
+    assert content_generator.writer_agent.tools == [content_generator.search_tools]
+    assert team.members[0].tools[0] is content_generator.search_tools
+
+def test_search_coalescing():
+    """Test that equivalent and concurrent queries trigger a single search."""
+    def slow_search(self, query, max_results):
+        time.sleep(0.1)
+        return f"results for {query}"
+    
+    tools = CoalescingDuckDuckGoTools()
+    with patch.object(CoalescingDuckDuckGoTools, "_search_text", autospec=True, side_effect=slow_search) as search:
+        threads = [
+            threading.Thread(target=tools.duckduckgo_search, args=("Chianti cheese",))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert tools.duckduckgo_search("cheese  CHIANTI") == "results for Chianti cheese"
+        assert search.call_count == 1
+
+def test_search_results_serialized_as_json():
+    """Test that search results reach the agent as the same JSON as before."""
+    results = [{"title": "Château Margaux", "href": "https://example.com", "body": "Bordeaux"}]
+    tools = CoalescingDuckDuckGoTools(modifier="wine")
+    with patch("search_tools.DDGS") as ddgs:
+        ddgs.return_value.text.return_value = results
+        output = tools.duckduckgo_search("Margaux", max_results=3)
+    
+    ddgs.return_value.text.assert_called_once_with(keywords="wine Margaux", max_results=3)
+    assert json.loads(output) == results
+
+def test_models_shared_by_id(content_generator):
+    """Test that agents and the team reuse one model instance per model id."""
+    team = content_generator._new_content_team()
+    
+    assert content_generator.illustrator_agent.model is content_generator.content_team.model
+    assert team.model is content_generator.content_team.model
+    assert team.members[0].model is content_generator.writer_agent.model
+
+def test_models_share_genai_client(content_generator):
+    """Test that both Gemini models use the generator's single google-genai client."""
+    client = content_generator._genai_client()
+    
+    assert content_generator.writer_agent.model.get_client() is client
+    assert content_generator.content_team.model.get_client() is client
+
+def test_file_tools_shared_per_output_dir(content_generator, test_output_dir, mock_gemini_api_key):
+    """Test that every team writing to one output directory reuses its FileTools."""
+    other = InstagramContentGenerator(mock_gemini_api_key, output_dir=str(test_output_dir))
+    
+    assert content_generator._new_content_team().tools[0] is content_generator.content_team.tools[0]
+    assert other.content_team.tools[0] is content_generator.content_team.tools[0]
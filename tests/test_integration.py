@@ -1,7 +1,12 @@
+import asyncio
+import json
+import logging
 import pytest
 from pathlib import Path
-from unittest.mock import patch
-from app import InstagramContentGenerator
+from unittest.mock import AsyncMock, Mock, patch
+import numpy as np
+from agno.run.team import RunResponseContentEvent, RunResponseStartedEvent
+from app import InstagramContentGenerator, ResponseCache, SemanticCache
 
 @patch('agno.team.Team')
 def test_team_coordination(mock_team, content_generator, sample_topic):
@@ -27,10 +32,11 @@ def test_team_coordination(mock_team, content_generator, sample_topic):
 def test_content_generation_workflow(content_generator, sample_topic, test_output_dir):
     """Test the complete content generation workflow."""
     result = content_generator.generate_content(sample_topic)
+    content_generator.flush()
     
     # Check output files
     post_file = test_output_dir / "post.txt"
-    history_file = test_output_dir / "content_history.json"
+    history_file = test_output_dir / "content_history.jsonl"
     
     assert post_file.exists()
     assert history_file.exists()
@@ -46,6 +52,7 @@ def test_team_error_handling(mock_team, content_generator, sample_topic):
     """Test that the team handles errors gracefully."""
     # Mock team to raise an exception
     mock_team.return_value.print_response.side_effect = Exception("Test error")
+    mock_team.return_value.run.side_effect = Exception("Test error")
     
     with pytest.raises(Exception):
         content_generator.generate_content(sample_topic)
@@ -63,4 +70,194 @@ def test_content_history_management(content_generator, sample_topic, test_output
     assert len(history) == len(topics)
     assert all(entry["topic"] in topics for entry in history)
     assert all("timestamp" in entry for entry in history)
-    assert all("content" in entry for entry in history) 
\ No newline at end of file
+    assert all("content" in entry for entry in history) 
+
+def test_batch_content_generation(content_generator):
+    """Test that batched topics are all generated and returned in order."""
+    topics = ["Wine 1", "Wine 2", "Wine 3"]
+    
+    with patch.object(
+        InstagramContentGenerator, "_arun_team", new=AsyncMock(side_effect=lambda topic, team=None: f"Post about {topic}")
+    ):
+        results = asyncio.run(content_generator.generate_content_batch(topics))
+    
+    assert [result["topic"] for result in results] == topics
+    assert [result["content"] for result in results] == [f"Post about {topic}" for topic in topics]
+    history = content_generator.get_content_history()
+    assert len(history) == len(topics)
+    assert [entry["timestamp"] for entry in history] == [result["timestamp"] for result in results]
+
+def test_async_content_generation(content_generator):
+    """Test that a single topic can be generated with the async API."""
+    with patch.object(
+        InstagramContentGenerator, "_arun_team", new=AsyncMock(return_value="Async post")
+    ) as arun:
+        result = asyncio.run(content_generator.agenerate_content("Wine 1"))
+        again = asyncio.run(content_generator.agenerate_content("Wine 1"))
+    
+    assert result["content"] == "Async post" and not result["cached"]
+    assert again["content"] == "Async post" and again["cached"]
+    assert arun.await_count == 1
+    assert arun.await_args.args[1] is not content_generator.content_team
+
+def test_async_generation_without_text_fails(content_generator):
+    """Test that a team response without text raises instead of being cached."""
+    team = Mock()
+    team.arun = AsyncMock(return_value=Mock(content=None))
+    
+    with patch.object(InstagramContentGenerator, "_new_content_team", return_value=team):
+        with pytest.raises(RuntimeError, match="no text"):
+            asyncio.run(content_generator.agenerate_content("Wine 1"))
+    
+    assert content_generator.get_content_history() == []
+
+def test_gemini_batch_generation(content_generator):
+    """Test that uncached topics go through a caption and an image-prompt batch job."""
+    def batch_output(*texts):
+        return b"".join(
+            json.dumps({"key": str(i), "response": {"candidates": [{"content": {"parts": [{"text": text}]}}]}}).encode() + b"\n"
+            for i, text in enumerate(texts)
+        )
+    
+    client = Mock()
+    client.batches.create.return_value.state.name = "JOB_STATE_SUCCEEDED"
+    client.files.download.side_effect = [batch_output("Rioja caption"), batch_output("Rioja photo")]
+    content_generator._client = client
+    content_generator.response_cache.set(content_generator._cache_key("Chianti"), "Saved Chianti post")
+    
+    results = content_generator.generate_batch(["Chianti", "Rioja"])
+    
+    assert results[0]["content"] == "Saved Chianti post" and results[0]["cached"]
+    assert results[1]["content"] == "- Post\nRioja caption\n- Prompt to generate an illustration\nRioja photo"
+    assert [call.kwargs["model"] for call in client.batches.create.call_args_list] == [
+        "gemini-2.0-flash-lite", "gemini-2.0-flash"
+    ]
+    assert [entry["topic"] for entry in content_generator.get_content_history()] == ["Rioja"]
+    
+    assert content_generator.generate_batch(["Rioja"])[0]["cached"]
+    with patch.object(
+        content_generator.content_team, "run", return_value=iter([RunResponseContentEvent(content="Team Rioja post")])
+    ) as run:
+        assert content_generator.generate_content("Rioja")["content"] == "Team Rioja post"
+    run.assert_called_once()
+
+def test_semantic_cache_reuses_similar_topics(test_output_dir):
+    """Test that a paraphrased topic hits the semantic cache and persists."""
+    vectors = {
+        "Italian Chianti with aged cheese": [1.0, 0.0, 0.1],
+        "aged cheese paired with Chianti": [0.98, 0.0, 0.12],
+        "Summer rosé wines": [0.0, 1.0, 0.0],
+    }
+    embed = lambda texts: np.array([vectors[text] for text in texts], dtype=np.float32)
+    cache_dir = test_output_dir / "cache"
+    
+    cache = SemanticCache(cache_dir, embed=embed)
+    content, vector = cache.lookup("Italian Chianti with aged cheese")
+    assert content is None
+    cache.add("Italian Chianti with aged cheese", "Chianti post", vector)
+    
+    reloaded = SemanticCache(cache_dir, embed=embed)
+    assert reloaded.lookup("aged cheese paired with Chianti")[0] == "Chianti post"
+    assert reloaded.lookup("Summer rosé wines")[0] is None
+    assert reloaded.stats == {"hits": 1, "misses": 1}
+
+def test_semantic_cache_batch_embeds_each_topic_once(test_output_dir, mock_gemini_api_key):
+    """Test that concurrent topics reuse their lookup embedding when added to the cache."""
+    generator = InstagramContentGenerator(mock_gemini_api_key, output_dir=str(test_output_dir), semantic_cache=True)
+    topics = ["Chianti", "Rioja", "Barolo wine"]
+    embed = Mock(side_effect=lambda texts: np.eye(3, dtype=np.float32)[[topics.index(text) for text in texts]])
+    generator.semantic_cache.embed = embed
+    
+    with patch.object(
+        InstagramContentGenerator, "_arun_team", new=AsyncMock(side_effect=lambda topic, team: f"Post about {topic}")
+    ):
+        asyncio.run(generator.generate_content_batch(topics))
+    
+    assert embed.call_count == 3
+    assert generator.semantic_cache.topics == topics
+
+def test_semantic_cache_exact_tier_skips_embedding(test_output_dir):
+    """Test that a repeated topic is answered by hash without embedding it."""
+    embed = Mock(return_value=np.array([[1.0, 0.0]], dtype=np.float32))
+    cache = SemanticCache(test_output_dir / "cache", embed=embed)
+    cache.add("Italian Chianti with aged cheese", "Chianti post")
+    embed.reset_mock()
+    
+    assert cache.lookup("  italian chianti   WITH aged cheese ") == ("Chianti post", None)
+    embed.assert_not_called()
+    assert cache.stats == {"hits": 1, "misses": 0}
+
+def test_semantic_cache_rebuilds_inconsistent_files(test_output_dir):
+    """Test that cache files left out of step by an interrupted write are rebuilt."""
+    embed = Mock(side_effect=lambda texts: np.ones((len(texts), 2), dtype=np.float32))
+    seed = lambda: [{"topic": "Chianti", "content": "Chianti post"}]
+    cache_dir = test_output_dir / "cache"
+    
+    SemanticCache(cache_dir, embed=embed, seed=seed).lookup("Chianti")
+    (cache_dir / "semantic_entries.json").write_text("[]", encoding='utf-8')
+    
+    assert SemanticCache(cache_dir, embed=embed, seed=seed).lookup("Chianti")[0] == "Chianti post"
+    assert not list(cache_dir.glob("*.tmp"))
+
+def test_embeddings_requested_in_chunks(content_generator):
+    """Test that seeding embeds many topics in as few requests as the API allows."""
+    client = Mock()
+    client.models.embed_content.side_effect = lambda model, contents: Mock(
+        embeddings=[Mock(values=[float(len(text)), 1.0]) for text in contents]
+    )
+    content_generator._client = client
+    
+    vectors = content_generator._embed_texts([f"topic {i}" for i in range(250)])
+    
+    assert vectors.shape == (250, 2) and vectors.dtype == np.float32
+    assert [len(call.kwargs["contents"]) for call in client.models.embed_content.call_args_list] == [100, 100, 50]
+
+def test_streamed_content_generation(content_generator, sample_topic, capsys):
+    """Test that streamed chunks are printed as they arrive and collected."""
+    events = [
+        RunResponseStartedEvent(),
+        RunResponseContentEvent(content="- Post\nCheers to Chianti"),
+        RunResponseContentEvent(content="\n- Prompt to generate an illustration"),
+    ]
+    
+    with patch.object(content_generator.content_team, "run", return_value=iter(events)):
+        result = content_generator.generate_content(sample_topic, save_to_file=False)
+    
+    assert result["content"] == "- Post\nCheers to Chianti\n- Prompt to generate an illustration"
+    assert "Cheers to Chianti" in capsys.readouterr().out
+
+def test_exact_response_cache(content_generator, sample_topic, test_output_dir, caplog, capsys):
+    """Test that repeated topics are served from the response cache unless bypassed."""
+    caplog.set_level(logging.INFO, logger="app")
+    with patch.object(
+        content_generator.content_team, "run",
+        side_effect=lambda *args, **kwargs: iter([RunResponseContentEvent(content="Fresh post")])
+    ) as run:
+        first = content_generator.generate_content(sample_topic, save_to_file=False)
+        capsys.readouterr()
+        second = content_generator.generate_content(sample_topic, save_to_file=False)
+        assert capsys.readouterr().out == "Fresh post\n"
+        assert (test_output_dir / "post.txt").read_text(encoding='utf-8') == "Fresh post"
+        forced = content_generator.generate_content(sample_topic, save_to_file=False, no_cache=True)
+    
+    assert run.call_count == 2
+    assert (first["cached"], second["cached"], forced["cached"]) == (False, True, False)
+    assert second["content"] == "Fresh post"
+    assert f"Reusing saved content for topic: {sample_topic}" in caplog.text
+
+def test_response_cache_memory_lru(test_output_dir):
+    """Test that recent responses are served from memory and old ones evicted to SQLite."""
+    test_output_dir.mkdir()
+    cache = ResponseCache(test_output_dir / "llm_cache.sqlite3", memory_size=2)
+    for key in ["a", "b", "c"]:
+        cache.set(key, f"post {key}")
+    
+    assert list(cache._memory) == ["b", "c"]
+    assert cache.get("a") == "post a"
+    assert list(cache._memory) == ["c", "a"]
+    assert cache.get("missing") is None
+    assert cache.stats == {"hits": 1, "misses": 1}
+
+def test_cache_key_ignores_topic_case_and_spacing(content_generator):
+    """Test that trivially different spellings of a topic share a cache key."""
+    assert content_generator._cache_key("  Italian CHIANTI  wine ") == content_generator._cache_key("italian chianti wine")
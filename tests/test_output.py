@@ -1,12 +1,16 @@
 import pytest
 import json
+import sqlite3
+import subprocess
+import sys
 from pathlib import Path
-from app import InstagramContentGenerator
+from app import InstagramContentGenerator, _read_history_tail
 
 def test_output_directory_creation(content_generator, test_output_dir):
     """Test that the output directory is created if it doesn't exist."""
     assert test_output_dir.exists()
     assert test_output_dir.is_dir()
+    assert not (test_output_dir / "llm_cache.sqlite3").exists()
 
 def test_post_file_generation(content_generator, sample_topic, test_output_dir):
     """Test that post files are generated with correct format."""
@@ -20,14 +24,15 @@ def test_post_file_generation(content_generator, sample_topic, test_output_dir):
     assert "- Prompt to generate an illustration" in content
 
 def test_content_history_file_generation(content_generator, sample_topic, test_output_dir):
-    """Test that content history is saved in JSON format."""
+    """Test that content history is saved in JSON Lines format."""
     content_generator.generate_content(sample_topic)
+    content_generator.flush()
     
-    history_file = test_output_dir / "content_history.json"
+    history_file = test_output_dir / "content_history.jsonl"
     assert history_file.exists()
     
     with open(history_file, 'r', encoding='utf-8') as f:
-        history = json.load(f)
+        history = [json.loads(line) for line in f]
     
     assert isinstance(history, list)
     assert len(history) > 0
@@ -50,10 +55,11 @@ def test_multiple_content_generation(content_generator, test_output_dir):
     
     for topic in topics:
         content_generator.generate_content(topic)
+    content_generator.flush()
     
-    history_file = test_output_dir / "content_history.json"
+    history_file = test_output_dir / "content_history.jsonl"
     with open(history_file, 'r', encoding='utf-8') as f:
-        history = json.load(f)
+        history = [json.loads(line) for line in f]
     
     assert len(history) == len(topics)
     assert all(entry["topic"] in topics for entry in history)
@@ -72,9 +78,193 @@ def test_file_encoding_handling(content_generator, test_output_dir):
 def test_output_file_permissions(content_generator, sample_topic, test_output_dir):
     """Test that output files have correct permissions."""
     content_generator.generate_content(sample_topic)
+    content_generator.flush()
     
     post_file = test_output_dir / "post.txt"
-    history_file = test_output_dir / "content_history.json"
+    history_file = test_output_dir / "content_history.jsonl"
     
     assert post_file.stat().st_mode & 0o777 == 0o644
-    assert history_file.stat().st_mode & 0o777 == 0o644 
\ No newline at end of file
+    assert history_file.stat().st_mode & 0o777 == 0o644 
+
+def test_legacy_history_migration(test_output_dir, mock_gemini_api_key):
+    """Test that a legacy JSON history is converted to JSON Lines on startup."""
+    test_output_dir.mkdir()
+    legacy = [
+        {"timestamp": "2025-01-01T00:00:00", "topic": "Château Margaux", "content": "Post"},
+        {"timestamp": "2025-01-02T00:00:00", "topic": "Barolo", "content": "A long Barolo post. " * 40}
+    ]
+    (test_output_dir / "content_history.json").write_text(json.dumps(legacy), encoding='utf-8')
+    
+    generator = InstagramContentGenerator(
+        gemini_api_key=mock_gemini_api_key,
+        output_dir=str(test_output_dir)
+    )
+    
+    assert generator.get_content_history() == legacy
+    assert "content_z" in (test_output_dir / "content_history.jsonl").read_text(encoding='utf-8')
+    assert (test_output_dir / "content_history.json.bak").exists()
+    assert not (test_output_dir / "content_history.json").exists()
+
+def test_legacy_history_migration_with_null_content(test_output_dir, mock_gemini_api_key, monkeypatch):
+    """Test that legacy entries without content are migrated and imported into SQLite."""
+    test_output_dir.mkdir()
+    legacy = [{"timestamp": "2025-01-01T00:00:00", "topic": "Château Margaux", "content": None}]
+    (test_output_dir / "content_history.json").write_text(json.dumps(legacy), encoding='utf-8')
+    
+    generator = InstagramContentGenerator(
+        gemini_api_key=mock_gemini_api_key,
+        output_dir=str(test_output_dir)
+    )
+    assert generator.get_content_history() == legacy
+    
+    monkeypatch.setenv("HISTORY_BACKEND", "sqlite")
+    generator = InstagramContentGenerator(
+        gemini_api_key=mock_gemini_api_key,
+        output_dir=str(test_output_dir)
+    )
+    assert generator.get_content_history() == [{**legacy[0], "content": ""}]
+
+def test_content_history_limit(content_generator):
+    """Test that the history can be limited to the most recent entries."""
+    for topic in ["Wine 1", "Wine 2", "Wine 3"]:
+        content_generator._save_content_history(topic, f"Post about {topic}")
+    
+    history = content_generator.get_content_history(limit=2)
+    
+    assert [entry["topic"] for entry in history] == ["Wine 2", "Wine 3"]
+
+def test_history_flush_writes_queued_entries(content_generator, test_output_dir):
+    """Test that flush waits for the background writer to persist entries."""
+    for topic in ["Wine 1", "Wine 2"]:
+        content_generator._save_content_history(topic, f"Post about {topic}")
+    content_generator.flush()
+    
+    with open(test_output_dir / "content_history.jsonl", 'r', encoding='utf-8') as f:
+        history = [json.loads(line) for line in f]
+    
+    assert [entry["topic"] for entry in history] == ["Wine 1", "Wine 2"]
+
+def test_history_writer_survives_errors(content_generator, monkeypatch):
+    """Test that a failed write is reported by flush without stopping the writer."""
+    with pytest.raises(TypeError):
+        content_generator._save_content_history("Wine 1", None)
+    
+    backend = content_generator._history_backend
+    monkeypatch.setattr(backend, "append", lambda entries: 1 / 0)
+    content_generator._save_content_history("Wine 1", "Post about Wine 1")
+    with pytest.raises(ZeroDivisionError):
+        content_generator.flush()
+    
+    monkeypatch.undo()
+    content_generator._save_content_history("Wine 2", "Post about Wine 2")
+    assert [entry["topic"] for entry in content_generator.get_content_history()] == ["Wine 2"]
+
+def test_history_file_reopened_after_flush(content_generator, test_output_dir):
+    """Test that flush releases the history file so a replaced file is picked up."""
+    history_file = test_output_dir / "content_history.jsonl"
+    content_generator._save_content_history("Wine 1", "Post about Wine 1")
+    content_generator.flush()
+    
+    history_file.unlink()
+    content_generator._save_content_history("Wine 2", "Post about Wine 2")
+    content_generator.flush()
+    
+    assert [entry["topic"] for entry in content_generator.get_content_history()] == ["Wine 2"]
+
+def test_large_history_content_is_compressed(content_generator, test_output_dir):
+    """Test that long contents are stored compressed and read back intact."""
+    long_content = "Chianti and aged Pecorino, a classic Tuscan pairing. " * 40
+    content_generator._save_content_history("Chianti", long_content)
+    content_generator._save_content_history("Rosé", "Short post")
+    content_generator.flush()
+    
+    with open(test_output_dir / "content_history.jsonl", 'r', encoding='utf-8') as f:
+        raw = [json.loads(line) for line in f]
+    
+    assert "content" not in raw[0] and "content_z" in raw[0]
+    assert raw[1]["content"] == "Short post"
+    assert [entry["content"] for entry in content_generator.get_content_history()] == [long_content, "Short post"]
+
+def test_history_kept_in_memory_after_first_read(content_generator, test_output_dir):
+    """Test that the history is read from disk once and returned as copies."""
+    content_generator._save_content_history("Wine 1", "Post about Wine 1")
+    first = content_generator.get_content_history()
+    first[0]["topic"] = "changed"
+    
+    (test_output_dir / "content_history.jsonl").unlink()
+    content_generator._save_content_history("Wine 2", "Post about Wine 2")
+    
+    assert [entry["topic"] for entry in content_generator.get_content_history()] == ["Wine 1", "Wine 2"]
+    assert [entry["topic"] for entry in content_generator.get_content_history(limit=1)] == ["Wine 2"]
+
+def test_history_access_skips_agent_imports(test_output_dir, mock_gemini_api_key):
+    """Test that reading the history never imports agno, google-genai or numpy."""
+    script = (
+        "import sys\n"
+        "from app import InstagramContentGenerator\n"
+        f"generator = InstagramContentGenerator({mock_gemini_api_key!r}, output_dir={str(test_output_dir)!r})\n"
+        "generator.get_content_history(limit=10)\n"
+        "print(sorted(name for name in ('agno', 'google.genai', 'numpy') if name in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+        cwd=Path(__file__).resolve().parent.parent
+    )
+    
+    assert result.stdout.strip() == "[]"
+
+def test_read_history_tail(tmp_path):
+    """Test that the tail reader returns the last entries with or without a final newline."""
+    path = tmp_path / "content_history.jsonl"
+    lines = [json.dumps({"topic": f"Wine {i}"}) for i in range(5)]
+    
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+    assert [entry["topic"] for entry in _read_history_tail(path, 2)] == ["Wine 3", "Wine 4"]
+    assert len(_read_history_tail(path, 10)) == 5
+    
+    path.write_text("\n".join(lines), encoding='utf-8')
+    assert [entry["topic"] for entry in _read_history_tail(path, 1)] == ["Wine 4"]
+    
+    path.write_text("", encoding='utf-8')
+    assert _read_history_tail(path, 3) == []
+
+def test_sqlite_history_backend(test_output_dir, mock_gemini_api_key, monkeypatch):
+    """Test that HISTORY_BACKEND=sqlite stores the history in a WAL database."""
+    monkeypatch.setenv("HISTORY_BACKEND", "sqlite")
+    generator = InstagramContentGenerator(
+        gemini_api_key=mock_gemini_api_key,
+        output_dir=str(test_output_dir)
+    )
+    for topic in ["Wine 1", "Wine 2", "Wine 3", "Wine 4"]:
+        generator._save_content_history(topic, f"Post about {topic}")
+    
+    assert [entry["topic"] for entry in generator.get_content_history(limit=2)] == ["Wine 3", "Wine 4"]
+    generator.flush()
+    assert generator._history_backend._conn is None
+    assert not (test_output_dir / "content_history.jsonl").exists()
+    
+    conn = sqlite3.connect(test_output_dir / "content_history.sqlite3")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("SELECT COUNT(*) FROM history").fetchone()[0] == 4
+    conn.close()
+
+def test_sqlite_history_imports_jsonl(test_output_dir, mock_gemini_api_key, monkeypatch):
+    """Test that switching to SQLite imports the existing JSON Lines history once."""
+    generator = InstagramContentGenerator(
+        gemini_api_key=mock_gemini_api_key,
+        output_dir=str(test_output_dir)
+    )
+    long_content = "A long Barolo post. " * 40
+    generator._save_content_history("Barolo", long_content)
+    generator.flush()
+    
+    monkeypatch.setenv("HISTORY_BACKEND", "sqlite")
+    for _ in range(2):
+        generator = InstagramContentGenerator(
+            gemini_api_key=mock_gemini_api_key,
+            output_dir=str(test_output_dir)
+        )
+    
+    assert generator.get_content_history() == [
+        {"timestamp": generator.get_content_history()[0]["timestamp"], "topic": "Barolo", "content": long_content}
+    ]
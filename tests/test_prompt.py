@@ -1,5 +1,8 @@
+import asyncio
+import io
 import pytest
-from app import PromptInterface
+from unittest.mock import Mock
+from app import HANDLERS, MenuSession, PromptInterface, _read_until_sentinel, amain, handle_invalid
 
 def test_prompt_interface_initialization(prompt_interface):
     """Test that the prompt interface is initialized correctly."""
@@ -57,4 +60,91 @@ def test_prompt_with_special_characters(prompt_interface):
     result = prompt_interface.process_prompt(special_prompt)
     
     assert "Château Margaux" in result["topic"]
-    assert "price" in str(result["requirements"]).lower() 
\ No newline at end of file
+    assert "price" in str(result["requirements"]).lower() 
+
+def test_keyword_extraction_single_pass(prompt_interface):
+    """Test that style and requirement keywords keep their table priority."""
+    prompt_lower = "a detailed, informal storytelling post with hashtags and no emojis"
+    
+    assert prompt_interface._extract_style(prompt_lower) == 'casual'
+    assert prompt_interface._extract_style("nothing to see here") == 'conversational'
+    assert prompt_interface._extract_requirements(prompt_lower) == [
+        'no_emojis', 'long_format', 'hashtags', 'story_format'
+    ]
+
+def test_style_matches_whole_words_in_order():
+    """Test that styles match whole words only and the first style word wins."""
+    assert PromptInterface._extract_style("an elegant yet fun post") == 'elegant'
+    assert PromptInterface._extract_style("an unprofessional, laid-back take") == 'casual'
+    assert PromptInterface._extract_style("a post about funghi") == 'conversational'
+
+def test_parse_instruction_cache(prompt_interface):
+    """Test that repeated prompts reuse the cached parse without sharing state."""
+    prompt = "Create a short post about Rioja with hashtags"
+    
+    first = prompt_interface._parse_instruction(prompt)
+    first['requirements'].append('mutated')
+    second = prompt_interface._parse_instruction(prompt)
+    
+    assert second['topic'] == first['topic']
+    assert second['requirements'] == ['short_format', 'hashtags']
+
+def test_menu_dispatch_is_lazy(monkeypatch, capsys):
+    """Test that informational menu options never build the generator."""
+    monkeypatch.setattr("builtins.input", lambda *args: "")
+    session = MenuSession("test_api_key")
+    
+    asyncio.run(HANDLERS["3"](session))
+    asyncio.run(HANDLERS["5"](session))
+    asyncio.run(handle_invalid(session))
+    
+    assert session._generator is None
+    assert asyncio.run(HANDLERS["6"](session)) is True
+    assert "Invalid option" in capsys.readouterr().out
+
+def test_extract_topic_strips_instruction_words():
+    """Test that instruction words are removed case-insensitively from the topic."""
+    assert PromptInterface._extract_topic("Create a POST about Château Margaux") == "a Château Margaux"
+    assert PromptInterface._extract_topic("Write content") == "Write content"
+
+def test_piped_multiline_input_stops_at_sentinel():
+    """Test that piped input is read up to END and the rest is left unread."""
+    stream = io.StringIO("Create a post about Rioja\nMake it fun\nEND\n4\n")
+    
+    assert _read_until_sentinel(stream) == "Create a post about Rioja\nMake it fun"
+    assert stream.read() == "4\n"
+    assert _read_until_sentinel(io.StringIO("Some text\ncancel\n")) is None
+
+def test_quick_topics_generate_in_background(monkeypatch, capsys):
+    """Test that quick topics run as background tasks that finish before exit."""
+    answers = iter(["2", "Chianti", "2", "Rioja", "6"])
+    monkeypatch.setattr("builtins.input", lambda *args: next(answers))
+    
+    async def fake_generate(topic, save_to_file=True, no_cache=False):
+        await asyncio.sleep(0.01)
+        return {"topic": topic, "content": f"Post about {topic}", "cached": False}
+    
+    session = MenuSession("test_api_key")
+    session._generator = Mock(agenerate_content=fake_generate)
+    asyncio.run(amain(session))
+    
+    out = capsys.readouterr().out
+    assert "Post about Chianti" in out and "Post about Rioja" in out
+    assert not session.pending
+
+def test_nlp_prompt_cancelled_by_ctrl_c(monkeypatch, capsys):
+    """Test that Ctrl+C at the multiline prompt cancels it and returns to the menu."""
+    def interrupt(*args):
+        raise KeyboardInterrupt
+    
+    monkeypatch.setattr("sys.stdin", Mock(isatty=lambda: True))
+    monkeypatch.setattr("builtins.input", interrupt)
+    
+    assert asyncio.run(HANDLERS["1"](MenuSession("test_api_key"))) is None
+    assert "Prompt cancelled" in capsys.readouterr().out
+
+def test_parse_instruction_save_opt_out(prompt_interface):
+    """Test that 'no save' and "don't save" turn off saving."""
+    assert prompt_interface._parse_instruction("A post about Rioja")['save_file'] is True
+    assert prompt_interface._parse_instruction("A post about Rioja, no save")['save_file'] is False
+    assert prompt_interface._parse_instruction("A post about Rioja. Don't save it")['save_file'] is False